@@ -5,16 +5,18 @@ https://github.com/asantaga/wiserHomeAssistantPlatform
 msparker@sky.com
 """
 import asyncio
+from collections import deque
 from datetime import timedelta
 from functools import partial
 import json
 import logging
+import re
+import time
 import requests.exceptions
 import voluptuous as vol
 from wiserHeatAPIv2.wiserhub import (
     TEMP_MINIMUM,
     TEMP_MAXIMUM,
-    WiserAPI,
     WiserHubConnectionError,
     WiserHubAuthenticationError,
     WiserHubRESTError,
@@ -42,41 +44,101 @@ from homeassistant.helpers.entity_registry import (
     async_entries_for_config_entry,
     async_entries_for_device,
 )
-from homeassistant.helpers.dispatcher import dispatcher_send
-from homeassistant.helpers.event import async_track_time_interval
-from homeassistant.util import Throttle
+from homeassistant.helpers.dispatcher import async_dispatcher_send, dispatcher_send
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.event import (
+    async_track_point_in_utc_time,
+    async_track_time_interval,
+)
+from homeassistant.util import Throttle, dt as dt_util, slugify
 
 from .const import (
+    BOOST_TICK_INTERVAL,
+    CONF_BACKGROUND_CONNECT,
     CONF_MOMENTS,
     CONF_SETPOINT_MODE,
     DEFAULT_SETPOINT_MODE,
     CONF_HEATING_BOOST_TEMP,
     CONF_HEATING_BOOST_TIME,
+    CONF_HUB_ID,
     CONF_HW_BOOST_TIME,
     CONF_LTS_SENSORS,
+    CONF_LTS_DEMAND_DEADBAND,
+    CONF_LTS_MAX_INTERVAL,
+    CONF_LTS_MIN_INTERVAL,
+    CONF_LTS_TEMP_DEADBAND,
+    CONF_RUNTIME_SENSORS,
+    CONF_STALE_AFTER,
+    CONF_TRACE_RECORDER,
+    CONNECT_RETRY_INTERVAL,
+    CONNECT_RETRY_MAX_INTERVAL,
     DATA,
+    DEADLINE_LOOKAHEAD,
+    DEADLINE_REFRESH_DELAY,
     DEFAULT_BOOST_TEMP,
     DEFAULT_BOOST_TEMP_TIME,
+    DEFAULT_LTS_DEMAND_DEADBAND,
+    DEFAULT_LTS_MAX_INTERVAL,
+    DEFAULT_LTS_MIN_INTERVAL,
+    DEFAULT_LTS_TEMP_DEADBAND,
     DEFAULT_SCAN_INTERVAL,
+    DEFAULT_STALE_AFTER,
+    DIAGNOSTICS_POLL_HISTORY,
     DOMAIN,
+    ENTITY_PREFIX,
+    EVENT_REPLAY_COMPLETE,
+    EVENT_SERVICE_RESULT,
+    HUB_JOB_PRIORITIES,
     MANUFACTURER,
+    PRIORITY_COMMAND,
+    PRIORITY_POLL,
+    ROOM,
+    TRACE_FILE,
     UPDATE_LISTENER,
     UPDATE_TRACK,
     WISER_PLATFORMS,
 )
 
-from .helpers import get_device_name, get_identifier
+from .api import WiserHubAPI
+from .command_queue import COMMAND_QUEUED, WiserCommandQueue, get_command_object, is_hub_object
+from .executor import WiserHubExecutor
+from .freshness import WiserFreshness
+from .metrics import WiserMetrics, WiserMetricsView
+from .signal_history import WiserSignalHistory
+from .topology import WiserTopology
+from .trace import WiserTraceRecorder
+from .websocket import async_register_websocket_commands
+from .helpers import (
+    get_device_name,
+    get_identifier,
+    get_next_schedule_datetime,
+    get_unique_id,
+    get_utc_datetime,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 MIN_TIME_BETWEEN_UPDATES = timedelta(seconds=60)
 
-ATTR_FILENAME = "filename"
-ATTR_COPYTO_ENTITY_ID = "to_entity_id"
-CONF_HUB_ID = "wiser_hub_id"
+# Errors where the hub may become reachable later
+CONNECTION_ERRORS = (
+    WiserHubConnectionError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.InvalidHeader,
+    requests.exceptions.ProxyError,
+)
+
+ATTR_ENABLED = "enabled"
 SERVICE_REMOVE_ORPHANED_ENTRIES = "remove_orphaned_entries"
+SERVICE_SET_AWAY_MODE = "set_away_mode"
+SERVICE_CANCEL_ALL_OVERRIDES = "cancel_all_overrides"
 
 SELECT_HUB_SCHEMA = vol.All(vol.Schema({vol.Required(CONF_HUB_ID): str}))
+ALL_HUBS_SCHEMA = vol.Schema({vol.Optional(CONF_HUB_ID): str})
+SET_AWAY_MODE_SCHEMA = vol.Schema(
+    {vol.Required(ATTR_ENABLED): cv.boolean, vol.Optional(CONF_HUB_ID): str}
+)
 
 CONFIG_SCHEMA = vol.Schema(
     {
@@ -107,6 +169,177 @@ CONFIG_SCHEMA = vol.Schema(
 
 async def async_setup(hass, config):
     """Set up of the Wiser Hub component."""
+    hass.data.setdefault(DOMAIN, {})
+    hass.http.register_view(WiserMetricsView)
+    async_register_websocket_commands(hass)
+
+    # Initialise global services, shared by all hubs
+    async def remove_orphaned_entries_service(service):
+        await asyncio.gather(
+            *[
+                handle.async_remove_orphaned_entries(
+                    handle._config_entry.entry_id, service.data[CONF_HUB_ID]
+                )
+                for handle in _async_get_handles(hass)
+            ]
+        )
+
+    async def set_away_mode_service(service):
+        async def async_set_away_mode(handle):
+            result = await handle.async_hub_command(
+                PRIORITY_COMMAND,
+                "system.away_mode_enabled",
+                setattr, handle.wiserhub.system, "away_mode_enabled", service.data[ATTR_ENABLED]
+            )
+            if result is not COMMAND_QUEUED:
+                await handle.async_update(no_throttle=True)
+            return result
+
+        await _async_call_all_hubs(
+            hass, SERVICE_SET_AWAY_MODE, service.data.get(CONF_HUB_ID), async_set_away_mode
+        )
+
+    async def cancel_all_overrides_service(service):
+        async def async_cancel_all_overrides(handle):
+            result = await handle.async_hub_command(
+                PRIORITY_COMMAND, "system.cancel_all_overrides", handle.wiserhub.system.cancel_all_overrides
+            )
+            if result is not COMMAND_QUEUED:
+                await handle.async_update(no_throttle=True)
+            return result
+
+        await _async_call_all_hubs(
+            hass, SERVICE_CANCEL_ALL_OVERRIDES, service.data.get(CONF_HUB_ID), async_cancel_all_overrides
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REMOVE_ORPHANED_ENTRIES,
+        remove_orphaned_entries_service,
+        schema=SELECT_HUB_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_AWAY_MODE,
+        set_away_mode_service,
+        schema=SET_AWAY_MODE_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CANCEL_ALL_OVERRIDES,
+        cancel_all_overrides_service,
+        schema=ALL_HUBS_SCHEMA,
+    )
+    return True
+
+
+@callback
+def _async_get_handles(hass, hub_id: str = None):
+    """Return handles of connected hubs, or only the named hub."""
+    return [
+        entry[DATA]
+        for entry in hass.data.get(DOMAIN, {}).values()
+        if DATA in entry
+        and entry[DATA].wiserhub
+        and (hub_id is None or entry[DATA].wiserhub.system.name == hub_id)
+    ]
+
+
+async def _async_call_all_hubs(hass, service: str, hub_id: str, target):
+    """Run target concurrently for each hub and fire an event with the results."""
+    handles = _async_get_handles(hass, hub_id)
+    results = await asyncio.gather(
+        *[target(handle) for handle in handles], return_exceptions=True
+    )
+
+    hubs = {}
+    for handle, result in zip(handles, results):
+        if isinstance(result, Exception):
+            _LOGGER.error(f"Wiser {service} failed for {handle.wiserhub.system.name}: {result}")
+            hubs[handle.wiserhub.system.name] = {"success": False, "error": str(result)}
+        else:
+            hubs[handle.wiserhub.system.name] = {"success": True, "queued": result is COMMAND_QUEUED}
+
+    _LOGGER.debug(f"Wiser {service} results - {hubs}")
+    hass.bus.async_fire(EVENT_SERVICE_RESULT, {"service": service, "hubs": hubs})
+    return hubs
+
+
+async def async_migrate_entry(hass, config_entry):
+    """Migrate old config entries."""
+    if config_entry.version == 1:
+        # Rewrite unique ids including room or plug names to object id only, keeping entity history
+        hub = re.escape(config_entry.data[CONF_NAME])
+        patterns = {
+            "climate": [(rf"^({hub}-WiserRoom-\d+)-.+$", r"\1")],
+            "switch": [(rf"^({hub}-SmartPlug-)Wiser .+-(\d+)$", r"\1switch-\2")],
+            "sensor": [
+                (rf"^({hub}-sensor-)LTS Temperature .+-(\d+)$", r"\1lts_current_temp-\2"),
+                (rf"^({hub}-sensor-)LTS Target Temperature .+-(\d+)$", r"\1lts_current_target_temp-\2"),
+                (rf"^({hub}-sensor-)LTS Heating Demand (?!Channel \d+-\d+$).+-(\d+)$", r"\1lts_room_demand-\2"),
+            ],
+        }
+        device_registry = dr.async_get(hass)
+        entity_registry = er.async_get(hass)
+
+        # Room switch ids have no room id, so take it from the climate entity of the same room
+        room_ids = {}
+        for entry in async_entries_for_config_entry(entity_registry, config_entry.entry_id):
+            match = re.match(rf"^{hub}-WiserRoom-(\d+)-", entry.unique_id)
+            if entry.domain == "climate" and match and entry.device_id:
+                room_ids[entry.device_id] = match.group(1)
+
+        @callback
+        def migrate_unique_id(entry):
+            new_unique_id = None
+            for pattern, replacement in patterns.get(entry.domain, []):
+                if re.match(pattern, entry.unique_id):
+                    new_unique_id = re.sub(pattern, replacement, entry.unique_id)
+                    break
+
+            if entry.domain == "switch" and entry.device_id in room_ids:
+                device = device_registry.async_get(entry.device_id)
+                prefix = f"{config_entry.data[CONF_NAME]}-room-switch-{device.name if device else None} "
+                if entry.unique_id.startswith(prefix):
+                    label = entry.unique_id[len(prefix):]
+                    new_unique_id = f"{config_entry.data[CONF_NAME]}-room-{label}-{room_ids[entry.device_id]}"
+
+            if not new_unique_id or entity_registry.async_get_entity_id(
+                entry.domain, DOMAIN, new_unique_id
+            ):
+                return None
+            _LOGGER.debug(f"Migrating {entry.entity_id} unique id from {entry.unique_id} to {new_unique_id}")
+            return {"new_unique_id": new_unique_id}
+
+        await er.async_migrate_entries(hass, config_entry.entry_id, migrate_unique_id)
+
+        # Room and device identifiers included names, so key them on the object id too
+        hub_identifier = f"{config_entry.data[CONF_NAME]} {ENTITY_PREFIX} HeatHub ({config_entry.data[CONF_NAME]})"
+        for device in dr.async_entries_for_config_entry(device_registry, config_entry.entry_id):
+            if (DOMAIN, hub_identifier) in device.identifiers:
+                continue
+            if device.id in room_ids:
+                new_identifier = f"{config_entry.data[CONF_NAME]}-room-{room_ids[device.id]}"
+            else:
+                # Every device has a signal sensor keyed by the device id
+                device_ids = set()
+                for entry in async_entries_for_device(entity_registry, device.id, include_disabled_entities=True):
+                    match = re.match(rf"^{hub}-sensor-.+-(\d+)$", entry.unique_id)
+                    if entry.domain == "sensor" and match:
+                        device_ids.add(match.group(1))
+                if len(device_ids) != 1:
+                    continue
+                new_identifier = f"{config_entry.data[CONF_NAME]}-device-{device_ids.pop()}"
+
+            if device_registry.async_get_device({(DOMAIN, new_identifier)}):
+                continue
+            _LOGGER.debug(f"Migrating device {device.name} identifier to {new_identifier}")
+            device_registry.async_update_device(device.id, new_identifiers={(DOMAIN, new_identifier)})
+
+        config_entry.version = 2
+        hass.config_entries.async_update_entry(config_entry)
+
+    _LOGGER.info(f"Migrated Wiser config entry to version {config_entry.version}")
     return True
 
 
@@ -118,86 +351,159 @@ async def async_setup_entry(hass, config_entry):
         hass,
         config_entry,
     )
+    background_connect = config_entry.options.get(CONF_BACKGROUND_CONNECT, False)
 
+    # Stop the hub executor and listeners if setup fails in any way
+    set_up = False
     try:
-        await hass.async_add_executor_job(data.connect)
-    except (
-        WiserHubConnectionError,
-        requests.exceptions.ConnectionError,
-        requests.exceptions.ChunkedEncodingError,
-        requests.exceptions.InvalidHeader,
-        requests.exceptions.ProxyError
-    ):
-        _LOGGER.error("Connection error trying to connect to wiser hub")
-        raise ConfigEntryNotReady
-    except (
-        KeyError,
-        WiserHubAuthenticationError
-    ):
-        _LOGGER.error("Failed to login to wiser hub")
-        return False
-    except RuntimeError as exr:
-        _LOGGER.error(f"Failed to setup wiser hub: {exr}")
-        return ConfigEntryNotReady
-    except requests.exceptions.HTTPError as exh:
-        if exh.response.status_code > 400 and exh.response.status_code < 500:
-            _LOGGER.error(f"Failed to login to wiser hub: {exh}")
+        await data.command_queue.async_load()
+
+        connected = True
+        try:
+            started = time.monotonic()
+            await data.async_add_hub_job(PRIORITY_POLL, data.connect)
+            data.startup_timings["connect"] = round(time.monotonic() - started, 3)
+        except CONNECTION_ERRORS:
+            _LOGGER.error("Connection error trying to connect to wiser hub")
+            if not background_connect:
+                raise ConfigEntryNotReady
+            connected = False
+        except (
+            KeyError,
+            WiserHubAuthenticationError
+        ):
+            _LOGGER.error("Failed to login to wiser hub")
             return False
-        raise ConfigEntryNotReady
+        except RuntimeError as exr:
+            _LOGGER.error(f"Failed to setup wiser hub: {exr}")
+            if not background_connect:
+                raise ConfigEntryNotReady
+            connected = False
+        except requests.exceptions.HTTPError as exh:
+            if exh.response.status_code > 400 and exh.response.status_code < 500:
+                _LOGGER.error(f"Failed to login to wiser hub: {exh}")
+                return False
+            if not background_connect:
+                raise ConfigEntryNotReady
+            connected = False
 
-    # Do first update
-    await hass.async_add_executor_job(data.update)
+        update_listener = config_entry.add_update_listener(_async_update_listener)
 
-    # Poll for updates in the background
-    update_track = async_track_time_interval(
-        hass,
-        lambda now: data.update(),
-        timedelta(
-            seconds=config_entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
-        ),
-    )
+        hass.data[DOMAIN][config_entry.entry_id] = {
+            DATA: data,
+            UPDATE_TRACK: None,
+            UPDATE_LISTENER: update_listener,
+        }
+
+        if connected:
+            await _async_setup_hub(hass, config_entry, data)
+        else:
+            # Finish setup now and add entities once the hub is reachable
+            _LOGGER.warning(
+                f"Wiser hub {data.host} is unreachable, retrying connection in the background"
+            )
+            hass.data[DOMAIN][config_entry.entry_id][UPDATE_TRACK] = data.async_start_background_connect(
+                partial(_async_setup_hub, hass, config_entry, data)
+            )
+        set_up = True
+    finally:
+        if not set_up:
+            entry_data = hass.data[DOMAIN].pop(config_entry.entry_id, None)
+            if entry_data:
+                if entry_data[UPDATE_TRACK]:
+                    entry_data[UPDATE_TRACK]()
+                entry_data[UPDATE_LISTENER]()
+            data.async_shutdown()
+
+    _LOGGER.info("Wiser Component Setup Completed")
+
+    return True
 
-    update_listener = config_entry.add_update_listener(_async_update_listener)
 
-    hass.data[DOMAIN][config_entry.entry_id] = {
-        DATA: data,
-        UPDATE_TRACK: update_track,
-        UPDATE_LISTENER: update_listener,
-    }
+async def _async_setup_hub(hass, config_entry, data):
+    """Start polling and add entities for a connected hub."""
+    # Hub data is already read by connecting, so only read again to send commands queued before a restart
+    if data.command_queue.depth:
+        await data.async_update(no_throttle=True, dispatch=False)
+    data.async_schedule_deadline_updates()
 
+    # Poll for updates in the background, or step through a replayed trace
+    if data.wiserhub.replay:
+        update_track = data.async_start_replay()
+    else:
+        update_track = _async_track_updates(hass, data)
+    hass.data[DOMAIN][config_entry.entry_id][UPDATE_TRACK] = update_track
+
+    # Tick boost countdowns locally between hub updates
+    data.async_start_boost_tick()
+
+    # Add hub, room and device entries before entities reference them
+    await data.async_update_device_registry()
+    _async_migrate_moment_unique_ids(hass, data)
 
     # Setup platforms
-    for platform in WISER_PLATFORMS:
-        hass.async_create_task(
-            hass.config_entries.async_forward_entry_setup(config_entry, platform)
+    async def async_setup_platform(platform):
+        started = time.monotonic()
+        await hass.config_entries.async_forward_entry_setup(config_entry, platform)
+        data.startup_timings[f"platform_{platform}"] = round(time.monotonic() - started, 3)
+
+    data.platforms = data.get_supported_platforms()
+    _LOGGER.debug(f"Setting up platforms {data.platforms}")
+    for platform in data.platforms:
+        hass.async_create_task(async_setup_platform(platform))
+
+
+@callback
+def _async_migrate_moment_unique_ids(hass, data):
+    """Rewrite moment button unique ids from moment name to id, which needs the hub's moments."""
+    if not data.wiserhub.moments:
+        return
+    entity_registry = er.async_get(hass)
+    for moment in data.wiserhub.moments.all:
+        entity_id = entity_registry.async_get_entity_id(
+            "button", DOMAIN, get_unique_id(data, "button", f"Moments {moment.name}", 0)
         )
+        new_unique_id = get_unique_id(data, "button", "moment", moment.id)
+        if entity_id and not entity_registry.async_get_entity_id("button", DOMAIN, new_unique_id):
+            _LOGGER.debug(f"Migrating {entity_id} unique id to {new_unique_id}")
+            entity_registry.async_update_entity(entity_id, new_unique_id=new_unique_id)
 
-    # Initialise global services
-    @callback
-    def remove_orphaned_entries_service(service):
-        for entry_id in hass.data[DOMAIN]:
-            hass.async_create_task(
-                data.async_remove_orphaned_entries(entry_id, service.data[CONF_HUB_ID])
-            )
 
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_REMOVE_ORPHANED_ENTRIES,
-        remove_orphaned_entries_service,
-        schema=SELECT_HUB_SCHEMA,
+@callback
+def _async_track_updates(hass, data):
+    """Poll the hub at the scan interval."""
+    return async_track_time_interval(
+        hass, lambda now: data.update(), timedelta(seconds=data.scan_interval)
     )
 
-    # Add hub as device
-    await data.async_update_device_registry()
 
-    _LOGGER.info("Wiser Component Setup Completed")
+async def _async_update_listener(hass, config_entry):
+    """Handle options update, only reloading if entities are added or removed."""
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    data = entry_data[DATA]
+    if config_entry.data[CONF_HOST] != data.host:
+        data.async_set_host(config_entry.data[CONF_HOST])
+        return
 
-    return True
+    if data.requires_reload(config_entry.options):
+        await hass.config_entries.async_reload(config_entry.entry_id)
+        return
 
+    scan_interval = data.scan_interval
+    data.apply_options(config_entry.options)
+    if data.scan_interval != scan_interval and data.wiserhub and not data.wiserhub.replay:
+        entry_data[UPDATE_TRACK]()
+        entry_data[UPDATE_TRACK] = _async_track_updates(hass, data)
+
+    _LOGGER.debug(f"Applied options for {data.host} without reload")
+    # Nothing to refresh while a background connection is still pending
+    if data.wiserhub:
+        data.async_dispatch_update()
 
-async def _async_update_listener(hass, config_entry):
-    """Handle options update."""
-    await hass.config_entries.async_reload(config_entry.entry_id)
+
+async def async_remove_entry(hass, config_entry):
+    """Remove commands queued for a deleted config entry."""
+    await WiserCommandQueue(hass, config_entry.entry_id).async_remove()
 
 
 async def async_unload_entry(hass, config_entry):
@@ -208,23 +514,21 @@ async def async_unload_entry(hass, config_entry):
     :param config_entry:
     :return:
     """
-    # Deregister services
-    _LOGGER.debug("Unregister Wiser Services")
-    hass.services.async_remove(DOMAIN, SERVICE_REMOVE_ORPHANED_ENTRIES)
-
     _LOGGER.debug("Unloading Wiser Component")
     # Unload a config entry
     unload_ok = all(
         await asyncio.gather(
             *[
                 hass.config_entries.async_forward_entry_unload(config_entry, platform)
-                for platform in WISER_PLATFORMS
+                for platform in hass.data[DOMAIN][config_entry.entry_id][DATA].platforms
             ]
         )
     )
 
-    hass.data[DOMAIN][config_entry.entry_id][UPDATE_TRACK]()
+    if hass.data[DOMAIN][config_entry.entry_id][UPDATE_TRACK]:
+        hass.data[DOMAIN][config_entry.entry_id][UPDATE_TRACK]()
     hass.data[DOMAIN][config_entry.entry_id][UPDATE_LISTENER]()
+    hass.data[DOMAIN][config_entry.entry_id][DATA].async_shutdown()
 
     if unload_ok:
         hass.data[DOMAIN].pop(config_entry.entry_id)
@@ -245,21 +549,75 @@ class WiserHubHandle:
         self.wiserhub = None
         self.minimum_temp = TEMP_MINIMUM
         self.maximum_temp = TEMP_MAXIMUM
-        self.boost_temp = config_entry.options.get(CONF_HEATING_BOOST_TEMP, DEFAULT_BOOST_TEMP)
-        self.boost_time = config_entry.options.get(
-            CONF_HEATING_BOOST_TIME, DEFAULT_BOOST_TEMP_TIME
-        )
-        self.hw_boost_time = config_entry.options.get(
-            CONF_HW_BOOST_TIME, DEFAULT_BOOST_TEMP_TIME
-        )
-        self.setpoint_mode = config_entry.options.get(CONF_SETPOINT_MODE, DEFAULT_SETPOINT_MODE)
         self.enable_moments = config_entry.options.get(CONF_MOMENTS, False)
         self.enable_lts_sensors = config_entry.options.get(CONF_LTS_SENSORS, False)
+        self.enable_runtime_sensors = config_entry.options.get(CONF_RUNTIME_SENSORS, False)
+        self._deadline_listeners = []
+        self._boost_tick_listener = None
+        self.snapshot_time = None
+        self._device_info = {}
+        self.executor = WiserHubExecutor(hass, self._name)
+        self.signal_history = WiserSignalHistory()
+        self.topology = WiserTopology()
+        self.metrics = WiserMetrics()
+        self.platforms = []
+        self.startup_timings = {}
+        self.poll_timings = deque(maxlen=DIAGNOSTICS_POLL_HISTORY)
+        self._dispatch_timing = None
+        self._dispatch_started = None
+        self.last_refreshed = None
+        self.last_attempted = None
+        self.consecutive_failures = 0
+        self.freshness = WiserFreshness()
+        self._stale_notified = False
+        self.trace_recorder = None
+        self.command_queue = WiserCommandQueue(hass, config_entry.entry_id)
+        self.apply_options(config_entry.options)
+
+    def apply_options(self, options):
+        """Apply options that take effect without reloading the integration."""
+        self.scan_interval = options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
+        self.boost_temp = options.get(CONF_HEATING_BOOST_TEMP, DEFAULT_BOOST_TEMP)
+        self.boost_time = options.get(CONF_HEATING_BOOST_TIME, DEFAULT_BOOST_TEMP_TIME)
+        self.hw_boost_time = options.get(CONF_HW_BOOST_TIME, DEFAULT_BOOST_TEMP_TIME)
+        self.setpoint_mode = options.get(CONF_SETPOINT_MODE, DEFAULT_SETPOINT_MODE)
+        self.lts_temp_deadband = options.get(CONF_LTS_TEMP_DEADBAND, DEFAULT_LTS_TEMP_DEADBAND)
+        self.lts_demand_deadband = options.get(CONF_LTS_DEMAND_DEADBAND, DEFAULT_LTS_DEMAND_DEADBAND)
+        self.lts_min_interval = options.get(CONF_LTS_MIN_INTERVAL, DEFAULT_LTS_MIN_INTERVAL)
+        self.lts_max_interval = options.get(CONF_LTS_MAX_INTERVAL, DEFAULT_LTS_MAX_INTERVAL)
+        self.stale_after = options.get(CONF_STALE_AFTER, DEFAULT_STALE_AFTER)
+
+        if options.get(CONF_TRACE_RECORDER, False) and not self.trace_recorder:
+            self.trace_recorder = WiserTraceRecorder(
+                self._hass.config.path(TRACE_FILE.format(slugify(self._name)))
+            )
+            _LOGGER.info(f"Recording Wiser hub trace to {self.trace_recorder.path}")
+        elif not options.get(CONF_TRACE_RECORDER, False) and self.trace_recorder:
+            self.trace_recorder.stop()
+            self.trace_recorder = None
+
+    def requires_reload(self, options) -> bool:
+        """Return if changed options add or remove entities, needing a reload."""
+        return (
+            options.get(CONF_MOMENTS, False) != self.enable_moments
+            or options.get(CONF_LTS_SENSORS, False) != self.enable_lts_sensors
+            or options.get(CONF_RUNTIME_SENSORS, False) != self.enable_runtime_sensors
+        )
 
     def connect(self):
         """Connect to Wiser Hub."""
-        self.wiserhub = WiserAPI(self.host, self.secret)
-        self._hass.async_create_task(self.async_update())
+        started = time.monotonic()
+        self.wiserhub = WiserHubAPI(self.host, self.secret)
+        # The connection read is the first poll, so entities are set up from it
+        self.snapshot_time = self.wiserhub.read_started
+        self._record_refresh()
+        if self.trace_recorder:
+            self.trace_recorder.record_poll(
+                dict(self.wiserhub.raw_data), time.monotonic() - started, self.wiserhub.endpoint_timings
+            )
+        if self.wiserhub.devices:
+            self.topology = WiserTopology(self.wiserhub.devices.all)
+            self.signal_history.add_samples(self.wiserhub.devices.all)
         return True
 
     @Throttle(MIN_TIME_BETWEEN_UPDATES)
@@ -267,57 +625,465 @@ class WiserHubHandle:
         """Call Wiser Hub async update."""
         self._hass.async_create_task(self.async_update())
 
-    async def async_update(self, no_throttle: bool = False):
+    def get_supported_platforms(self):
+        """Return platforms that will create entities for this hub."""
+        has_rooms = bool(self.wiserhub.rooms) and any(
+            len(room.devices) > 0 for room in self.wiserhub.rooms.all
+        )
+        has_smartplugs = bool(self.wiserhub.devices) and self.wiserhub.devices.smartplugs.count > 0
+        supported = {
+            "climate": has_rooms,
+            "sensor": True,
+            "switch": True,
+            "select": bool(self.wiserhub.hotwater) or has_smartplugs,
+            "button": True,
+        }
+        return [platform for platform in WISER_PLATFORMS if supported[platform]]
+
+    async def async_update(self, no_throttle: bool = False, dispatch: bool = True):
         """Update from Wiser Hub."""
+        started = time.monotonic()
+        self.last_attempted = dt_util.utcnow()
         try:
-            result = await self._hass.async_add_executor_job(self.wiserhub.read_hub_data)
+            result = await self.async_add_hub_job(PRIORITY_POLL, self.wiserhub.read_hub_data)
             if result is not None:
                 _LOGGER.debug(f"Wiser Hub data updated - {self.wiserhub.system.name}")
-                # Send update notice to all components to update
-                dispatcher_send(self._hass, f"{self.wiserhub.system.name}-HubUpdateMessage")
-                return True
-
-            _LOGGER.error(f"Unable to update from Wiser hub - {self.wiserhub.system.name}")
-            return False
+                self.snapshot_time = self.wiserhub.read_started
+                self._record_refresh()
+                self.metrics.inc("wiser_polls_total", result="success")
+                self.metrics.observe("wiser_poll_duration_seconds", time.monotonic() - started)
+                self._record_poll_timing(started)
+                if self.trace_recorder:
+                    self.trace_recorder.record_poll(
+                        dict(self.wiserhub.raw_data), time.monotonic() - started, self.wiserhub.endpoint_timings
+                    )
+                if self.wiserhub.devices:
+                    self.topology = WiserTopology(self.wiserhub.devices.all)
+                    self.signal_history.add_samples(self.wiserhub.devices.all)
+                if self.command_queue.depth and await self._async_replay_commands():
+                    # Read again so entities see the replayed commands
+                    return await self.async_update(no_throttle=True, dispatch=dispatch)
+            else:
+                _LOGGER.error(f"Unable to update from Wiser hub - {self.wiserhub.system.name}")
+                self.metrics.inc("wiser_polls_total", result="error")
+                self._async_poll_failed()
+                return False
         except json.decoder.JSONDecodeError as ex:
             _LOGGER.error(
                 f"Data not in JSON format when getting data from the Wiser hub. Error is {str(ex)}"
             )
+            self._record_poll_error(ex, started)
             return False
         except WiserHubConnectionError as ex:
             _LOGGER.error(f"Unable to update from Wiser hub {self.wiserhub.system.name} due to timeout error")
             _LOGGER.debug(f"Error is {str(ex)}")
+            self._record_poll_error(ex, started)
             return False
         except Exception as ex:  # pylint: disable=broad-except
             _LOGGER.error(f"Unable to update from Wiser hub {self.wiserhub.system.name} due to unknown error")
             _LOGGER.debug(f"Error is {str(ex)}")
+            self._record_poll_error(ex, started)
             return False
 
+        # Entity updates and deadlines are not part of reading the hub, so errors here do not fail the poll
+        if dispatch:
+            self.async_dispatch_update()
+        return True
+
+    def _record_poll_error(self, ex: Exception, started: float):
+        self.metrics.inc("wiser_polls_total", result="error")
+        self.metrics.inc("wiser_poll_errors_total", exception=type(ex).__name__)
+        if self.trace_recorder:
+            self.trace_recorder.record_poll_error(ex, time.monotonic() - started)
+        self._async_poll_failed()
+
+    def _record_refresh(self):
+        """Record a successful hub read and which objects changed."""
+        self.last_refreshed = dt_util.utcnow()
+        self.consecutive_failures = 0
+        self._stale_notified = False
+        self.freshness.update(self.wiserhub.raw_data.get("domain", {}), self.last_refreshed)
+
+    @callback
+    def _async_poll_failed(self):
+        """Count a failed hub read and notify entities once data becomes stale."""
+        self.consecutive_failures += 1
+        if self.is_stale and not self._stale_notified:
+            _LOGGER.warning(
+                f"No update from Wiser hub {self.wiserhub.system.name} for {self.stale_after}s, marking entities unavailable"
+            )
+            self._stale_notified = True
+            self.async_dispatch_update()
+        else:
+            async_dispatcher_send(self._hass, f"{self.wiserhub.system.name}-FreshnessMessage")
+
+    @property
+    def data_age(self):
+        """Return seconds since the last successful hub read."""
+        if self.last_refreshed is None:
+            return None
+        return (dt_util.utcnow() - self.last_refreshed).total_seconds()
+
+    @property
+    def is_stale(self) -> bool:
+        """Return if hub data is older than the staleness threshold."""
+        return bool(self.stale_after) and self.data_age is not None and self.data_age > self.stale_after
+
+    def _record_poll_timing(self, started: float):
+        """Record timings of a successful poll, completing dispatch as entities update."""
+        timing = {
+            "time": dt_util.utcnow().isoformat(),
+            "total": round(time.monotonic() - started, 3),
+            "dispatch": None,
+        }
+        for phase, duration in self.wiserhub.read_timings.items():
+            timing[phase] = round(duration, 3)
+        timing["queue_wait"] = round(
+            timing["total"] - timing.get("network", 0) - timing.get("parse", 0), 3
+        )
+        self.poll_timings.append(timing)
+        self._dispatch_timing = timing
+        self._dispatch_started = time.monotonic()
+
+    def record_state_write(self, platform: str, written: bool = True):
+        """Record an entity update received and whether its state was written."""
+        if self._dispatch_timing is not None:
+            self._dispatch_timing["dispatch"] = round(time.monotonic() - self._dispatch_started, 3)
+        self.metrics.inc("wiser_dispatch_deliveries_total", platform=platform)
+        if written:
+            self.metrics.inc("wiser_state_writes_total", platform=platform)
+        else:
+            self.metrics.inc("wiser_state_writes_skipped_total", platform=platform)
+
+    async def async_add_hub_job(self, priority: int, target, *args):
+        """Run a hub job on the hub's own executor."""
+        started = time.monotonic()
+        try:
+            return await self.executor.async_add_job(priority, target, *args)
+        finally:
+            self.metrics.observe(
+                "wiser_hub_job_duration_seconds",
+                time.monotonic() - started,
+                type=HUB_JOB_PRIORITIES[priority],
+            )
+
+    async def async_hub_command(self, priority: int, command: str, target, *args):
+        """Run a hub command, recording its latency and failures by command type.
+
+        Commands issued while the hub is unreachable are queued and replayed on reconnection,
+        returning COMMAND_QUEUED so callers do not wait on the hub for their result.
+        """
+        if priority == PRIORITY_COMMAND and self.consecutive_failures and self._queue_command(command, target, args):
+            return COMMAND_QUEUED
+
+        started = time.monotonic()
+        try:
+            result = await self.async_add_hub_job(priority, target, *args)
+        except Exception as ex:
+            self.metrics.inc("wiser_command_failures_total", command=command, exception=type(ex).__name__)
+            self._record_command(command, args, started, ex)
+            if (
+                isinstance(ex, CONNECTION_ERRORS)
+                and priority == PRIORITY_COMMAND
+                and self._queue_command(command, target, args)
+            ):
+                return COMMAND_QUEUED
+            raise
+        self._record_command(command, args, started)
+        return result
+
+    def _queue_command(self, command: str, target, args: tuple) -> bool:
+        """Queue a command to send once the hub is reachable, if it can be stored."""
+        if self.wiserhub.replay:
+            return False
+        if target is setattr:
+            hub_object, method, args = args[0], "setattr", args[1:]
+        elif hasattr(target, "__self__"):
+            hub_object, method = target.__self__, target.__name__
+        else:
+            return False
+
+        # Entity methods cannot be replayed, only commands on hub objects
+        if not is_hub_object(hub_object):
+            return False
+        if not self.command_queue.add(command, getattr(hub_object, "id", None), method, args):
+            return False
+        _LOGGER.warning(
+            f"Wiser hub {self.wiserhub.system.name} is unreachable, queued {command} to send when it reconnects"
+        )
+        return True
+
+    async def _async_replay_commands(self) -> bool:
+        """Send commands queued while the hub was unreachable, returning if any were sent."""
+        sent = False
+        for record in self.command_queue.pop_all():
+            try:
+                hub_object = get_command_object(self.wiserhub, record["command"], record["object_id"])
+                if hub_object is None:
+                    _LOGGER.warning(f"Dropping queued Wiser command {record['command']} as its target no longer exists")
+                    continue
+                if record["method"] == "setattr":
+                    target, args = setattr, (hub_object, *record["args"])
+                else:
+                    target, args = getattr(hub_object, record["method"]), tuple(record["args"])
+
+                _LOGGER.info(f"Sending queued Wiser command {record['command']} from {record['queued']}")
+                result = await self.async_hub_command(PRIORITY_COMMAND, record["command"], target, *args)
+                # Not sent if queued again as the hub became unreachable
+                sent = sent or result is not COMMAND_QUEUED
+            except Exception as ex:  # pylint: disable=broad-except
+                _LOGGER.error(f"Queued Wiser command {record['command']} failed: {ex}")
+        return sent
+
+    def _record_command(self, command: str, args: tuple, started: float, ex: Exception = None):
+        latency = time.monotonic() - started
+        self.metrics.observe("wiser_command_duration_seconds", latency, command=command)
+        if self.trace_recorder:
+            self.trace_recorder.record_command(command, args, latency, ex)
+
+    @callback
+    def async_dispatch_update(self):
+        """Send update notice to all components to update."""
+        self.metrics.inc("wiser_dispatches_total", signal="update")
+        dispatcher_send(self._hass, f"{self.wiserhub.system.name}-HubUpdateMessage")
+        try:
+            self.async_schedule_deadline_updates()
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOGGER.error(f"Unable to schedule deadline updates for {self.wiserhub.system.name}: {ex}")
+
+    def get_deadlines(self):
+        """Return utc times of known boost expiries and schedule changes."""
+        deadlines = set()
+        schedules = []
+
+        if self.wiserhub.rooms:
+            for room in self.wiserhub.rooms.all:
+                if room.is_boosted and room.boost_end_time:
+                    deadlines.add(get_utc_datetime(room.boost_end_time))
+                schedules.append(room.schedule)
+
+        if self.wiserhub.hotwater:
+            if self.wiserhub.hotwater.is_boosted:
+                deadlines.add(get_utc_datetime(self.wiserhub.hotwater.boost_end_time))
+            schedules.append(self.wiserhub.hotwater.schedule)
+
+        if self.wiserhub.devices:
+            schedules.extend([plug.schedule for plug in self.wiserhub.devices.smartplugs.all])
+
+        for schedule in schedules:
+            if schedule:
+                next_change = get_next_schedule_datetime(schedule.next)
+                if next_change:
+                    deadlines.add(dt_util.as_utc(next_change))
+
+        return deadlines
+
+    @callback
+    def async_schedule_deadline_updates(self):
+        """Arm one-shot hub updates shortly after each known deadline."""
+        self.async_cancel_deadline_updates()
+        if self.wiserhub.replay:
+            return
+
+        now = dt_util.utcnow()
+        last_armed = None
+        for deadline in sorted(self.get_deadlines()):
+            if deadline <= now or (deadline - now).total_seconds() > DEADLINE_LOOKAHEAD:
+                continue
+            # Deadlines close together are covered by a single update
+            if last_armed and (deadline - last_armed).total_seconds() < DEADLINE_REFRESH_DELAY:
+                continue
+            last_armed = deadline
+            self._deadline_listeners.append(
+                async_track_point_in_utc_time(
+                    self._hass,
+                    self._async_deadline_update,
+                    deadline + timedelta(seconds=DEADLINE_REFRESH_DELAY),
+                )
+            )
+        _LOGGER.debug(f"Armed {len(self._deadline_listeners)} deadline updates for {self.wiserhub.system.name}")
+
+    @callback
+    def async_cancel_deadline_updates(self):
+        """Cancel any armed deadline updates."""
+        for remove_listener in self._deadline_listeners:
+            remove_listener()
+        self._deadline_listeners = []
+
+    @callback
+    def async_start_boost_tick(self):
+        """Start the local boost countdown tick."""
+        self._boost_tick_listener = async_track_time_interval(
+            self._hass, self._async_boost_tick, timedelta(seconds=BOOST_TICK_INTERVAL)
+        )
+
+    @callback
+    def _async_boost_tick(self, now):
+        """Notify boosted entities to refresh their countdown from cached data."""
+        boosted = self.wiserhub.hotwater and self.wiserhub.hotwater.is_boosted
+        if not boosted and self.wiserhub.rooms:
+            boosted = any(room.is_boosted for room in self.wiserhub.rooms.all)
+        if boosted:
+            self._dispatch_timing = None
+            self.metrics.inc("wiser_dispatches_total", signal="boost_tick")
+            async_dispatcher_send(self._hass, f"{self.wiserhub.system.name}-BoostTickMessage")
+
+    @callback
+    def async_start_replay(self):
+        """Start stepping through the replayed trace, returning a cancel function."""
+        task = self._hass.async_create_task(self._async_replay())
+        return task.cancel
+
+    async def _async_replay(self):
+        """Update from each recorded poll at the recorded pace divided by the replay speed."""
+        replay = self.wiserhub.replay
+        _LOGGER.info(f"Replaying Wiser hub trace {replay.path} at {replay.speed}x speed")
+        started = time.monotonic()
+        while not replay.finished:
+            await asyncio.sleep(replay.next_delay)
+            await self.async_add_hub_job(PRIORITY_POLL, replay.advance)
+            await self.async_update(no_throttle=True)
+
+        dispatch_times = [poll["dispatch"] for poll in self.poll_timings if poll["dispatch"] is not None]
+        summary = {
+            "hub": self.wiserhub.system.name,
+            "trace": replay.path,
+            "polls": replay.polls,
+            "duration": round(time.monotonic() - started, 3),
+            "state_writes": sum(
+                counter["value"] for counter in self.metrics.get_counters("wiser_state_writes_total")
+            ),
+            "skipped_writes": sum(
+                counter["value"] for counter in self.metrics.get_counters("wiser_state_writes_skipped_total")
+            ),
+            "average_dispatch": round(sum(dispatch_times) / len(dispatch_times), 3) if dispatch_times else None,
+        }
+        _LOGGER.info(f"Replay of Wiser hub trace complete - {summary}")
+        self._hass.bus.async_fire(EVENT_REPLAY_COMPLETE, summary)
+
+    @callback
+    def async_set_host(self, host: str):
+        """Retarget the hub connection to a new host and refresh from it."""
+        if self.wiserhub and self.wiserhub.replay:
+            return
+        _LOGGER.info(f"Wiser hub {self._name} host changed from {self.host} to {host}")
+        self.host = host
+        if self.wiserhub:
+            self.wiserhub.set_host(host)
+            self._hass.async_create_task(self.async_update(no_throttle=True))
+
+    @callback
+    def async_start_background_connect(self, on_connected):
+        """Retry connecting to the hub in the background, returning a cancel callable."""
+        task = self._hass.async_create_task(self._async_background_connect(on_connected))
+        return task.cancel
+
+    async def _async_background_connect(self, on_connected):
+        """Connect to the hub with backoff, then run on_connected."""
+        delay = CONNECT_RETRY_INTERVAL
+        while True:
+            await asyncio.sleep(delay)
+            started = time.monotonic()
+            self.last_attempted = dt_util.utcnow()
+            try:
+                await self.async_add_hub_job(PRIORITY_POLL, self.connect)
+                break
+            except WiserHubAuthenticationError:
+                _LOGGER.error(f"Failed to login to wiser hub {self.host}, stopping connection retries")
+                return
+            except Exception as ex:  # pylint: disable=broad-except
+                # A rebooting hub gives server errors, timeouts and partial payloads, so keep retrying
+                self.consecutive_failures += 1
+                self.metrics.inc("wiser_poll_errors_total", exception=type(ex).__name__)
+                if isinstance(ex, CONNECTION_ERRORS):
+                    _LOGGER.debug(f"Background connection to wiser hub {self.host} failed: {ex}")
+                else:
+                    _LOGGER.warning(f"Background connection to wiser hub {self.host} failed: {ex!r}")
+                delay = min(delay * 2, CONNECT_RETRY_MAX_INTERVAL)
+
+        self.startup_timings["connect"] = round(time.monotonic() - started, 3)
+        _LOGGER.info(f"Connected to wiser hub {self.wiserhub.system.name} in the background")
+        await on_connected()
+
+    @callback
+    def async_shutdown(self):
+        """Cancel all timers owned by the handler."""
+        self.async_cancel_deadline_updates()
+        if self._boost_tick_listener:
+            self._boost_tick_listener()
+            self._boost_tick_listener = None
+        self.executor.shutdown()
+        if self.trace_recorder:
+            self.trace_recorder.stop()
+        if self.wiserhub and self.wiserhub.replay:
+            self.wiserhub.replay.close()
+
+    async def _async_deadline_update(self, now):
+        """Update from Wiser Hub after a boost expiry or schedule change."""
+        _LOGGER.debug(f"Deadline reached, requesting hub update for {self.wiserhub.system.name}")
+        await self.async_update(no_throttle=True)
 
     @property
     def unique_id(self):
         """Return a unique name, otherwise config flow does not work right."""
         return self.wiserhub.system.name
 
+    def _build_device_info(self, id, type="device") -> DeviceInfo:
+        """Return registry details of the hub, a room or a device."""
+        device_info = DeviceInfo(
+            name=get_device_name(self, id, type),
+            identifiers={(DOMAIN, get_identifier(self, id, type))},
+            manufacturer=MANUFACTURER,
+            via_device=(DOMAIN, self.wiserhub.system.name),
+        )
+        if type == "room":
+            device_info["model"] = ROOM.title()
+        elif id == 0:
+            device_info["model"] = self.wiserhub.system.model
+            device_info["sw_version"] = self.wiserhub.system.firmware_version
+        else:
+            device = self.wiserhub.devices.get_by_id(id)
+            device_info["model"] = device.model
+            device_info["sw_version"] = device.firmware_version
+        return device_info
+
+    def get_device_info(self, id, type="device") -> DeviceInfo:
+        """Return cached registry details of the hub, a room or a device."""
+        key = (type, id)
+        if key not in self._device_info:
+            self._device_info[key] = self._build_device_info(id, type)
+        return self._device_info[key]
+
     async def async_update_device_registry(self):
-        """Update device registry."""
+        """Register the hub and all its rooms and devices in one pass."""
+        self._device_info = {("device", 0): self._build_device_info(0)}
+        if self.wiserhub.rooms:
+            for room in self.wiserhub.rooms.all:
+                if len(room.devices) > 0:
+                    self._device_info[("room", room.id)] = self._build_device_info(room.id, "room")
+        if self.wiserhub.devices:
+            for device in self.wiserhub.devices.all:
+                if device.id != 0:
+                    self._device_info[("device", device.id)] = self._build_device_info(device.id)
+
         device_registry = dr.async_get(self._hass)
         device_registry.async_get_or_create(
             config_entry_id=self._config_entry.entry_id,
             connections={(CONNECTION_NETWORK_MAC, self.wiserhub.system.network.mac_address)},
-            identifiers={(DOMAIN, get_identifier(self, 0))},
-            manufacturer=MANUFACTURER,
-            name=get_device_name(self, 0),
-            model=self.wiserhub.system.model,
-            sw_version=self.wiserhub.system.firmware_version,
+            **{key: value for key, value in self._device_info[("device", 0)].items() if key != "via_device"},
         )
+        for key, device_info in self._device_info.items():
+            if key != ("device", 0):
+                device_registry.async_get_or_create(
+                    config_entry_id=self._config_entry.entry_id, **device_info
+                )
 
     @callback
     async def async_remove_orphaned_entries(self, entry_id, wiser_hub_id: str):
         """Remove orphaned Wiser entries from device registry"""
         api = self._hass.data[DOMAIN][entry_id]["data"]
 
-        if api.wiserhub.system.name == wiser_hub_id:
+        if api.wiserhub and api.wiserhub.system.name == wiser_hub_id:
             _LOGGER.info(f"Removing orphaned devices for {wiser_hub_id}")
 
             device_registry = dr.async_get(self._hass)
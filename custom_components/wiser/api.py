@@ -0,0 +1,194 @@
+"""
+Wiser Hub API with read instrumentation.
+
+https://github.com/asantaga/wiserHomeAssistantPlatform
+msparker@sky.com
+"""
+import copy
+import logging
+import time
+
+from wiserHeatAPIv2.const import (
+    TEXT_OFF,
+    WISERHUBDOMAIN,
+    WISERHUBNETWORK,
+    WISERHUBSCHEDULES,
+    WISERSMARTPLUG,
+)
+from wiserHeatAPIv2.wiserhub import WiserAPI
+from wiserHeatAPIv2.devices import _WiserDeviceCollection
+from wiserHeatAPIv2.heating import _WiserHeatingChannelCollection
+from wiserHeatAPIv2.hot_water import _WiserHotwater
+from wiserHeatAPIv2.moments import _WiserMomentCollection
+from wiserHeatAPIv2.rest_controller import _WiserConnection, _WiserRestController
+from wiserHeatAPIv2.room import _WiserRoomCollection
+from wiserHeatAPIv2.schedule import _WiserScheduleCollection
+from wiserHeatAPIv2.system import _WiserSystem
+
+from .const import PROBE_CACHE_TTL
+from .replay import WiserTraceReplay, parse_replay_host
+
+_LOGGER = logging.getLogger(__name__)
+
+# Network payloads of recent probes by (host, secret), with the time read
+_probe_cache = {}
+
+HUB_ENDPOINTS = {
+    WISERHUBDOMAIN: "domain",
+    WISERHUBNETWORK: "network",
+    WISERHUBSCHEDULES: "schedules",
+}
+
+
+class WiserRestController(_WiserRestController):
+    """Rest controller keeping the raw payload and fetch time of each hub read."""
+
+    def __init__(self, wiser_connection, api):
+        """Initialise the controller."""
+        super().__init__(wiser_connection)
+        self._api = api
+
+    def _get_hub_data(self, url: str):
+        """Read data from hub, recording fetch time and payload."""
+        started = time.monotonic()
+        data = self._fetch_hub_data(url)
+        endpoint = HUB_ENDPOINTS.get(url, url)
+        self._api.endpoint_timings[endpoint] = time.monotonic() - started
+        self._api.raw_data[endpoint] = data
+        return data
+
+    def _fetch_hub_data(self, url: str):
+        """Read data from hub."""
+        return super()._get_hub_data(url)
+
+
+def probe_hub(host: str, secret: str) -> str:
+    """Authenticate to the hub and return its name, reading only network data."""
+    replay = parse_replay_host(host)
+    if replay:
+        with WiserTraceReplay(*replay) as trace:
+            network_data = trace.get_data(HUB_ENDPOINTS[WISERHUBNETWORK])
+    else:
+        connection = _WiserConnection()
+        connection.host = host
+        connection.secret = secret
+        network_data = _WiserRestController(connection)._get_hub_data(WISERHUBNETWORK)
+        _probe_cache[(host, secret)] = (time.monotonic(), network_data)
+    return network_data.get("Station", {}).get("NetworkInterface", {}).get("HostName")
+
+
+def _take_probe(host: str, secret: str):
+    """Return network data of a recent probe of the hub, or None if expired."""
+    cached = _probe_cache.pop((host, secret), None)
+    if cached and time.monotonic() - cached[0] < PROBE_CACHE_TTL:
+        return cached[1]
+    return None
+
+
+class WiserReplayRestController(WiserRestController):
+    """Rest controller serving hub data from a recorded trace."""
+
+    def _fetch_hub_data(self, url: str):
+        """Return recorded data for the current replayed poll."""
+        return copy.deepcopy(self._api.replay.get_data(HUB_ENDPOINTS.get(url, url)))
+
+    def _patch_hub_data(self, url: str, patch_data: dict):
+        """Ignore commands as there is no hub to send them to."""
+        _LOGGER.debug(f"Replay ignoring command to {url} with {patch_data}")
+        return True
+
+
+class WiserHubAPI(WiserAPI):
+    """WiserAPI recording network and parse timings of each hub read."""
+
+    def __init__(self, host: str, secret: str, *args, **kwargs):
+        """Initialise the api and read the hub, or the trace if a replay host."""
+        self.raw_data = {}
+        self.endpoint_timings = {}
+        self.read_timings = {}
+        self.read_started = None
+        self.replay = None
+        self._probe_data = _take_probe(host, secret)
+        replay = parse_replay_host(host)
+        if replay:
+            self.replay = WiserTraceReplay(*replay)
+        super().__init__(host, secret, *args, **kwargs)
+
+    def set_host(self, host: str):
+        """Send subsequent reads and commands to a new host."""
+        self._wiser_api_connection.host = host
+
+    def read_smartplug(self, smartplug_id: int):
+        """Read the state of a single smart plug and update its output state.
+
+        Returns the smart plug, or None if it is not known.
+        """
+        smartplug = self._devices.smartplugs.get_by_id(smartplug_id) if self._devices else None
+        if smartplug is None:
+            return None
+        if self.replay:
+            # Traces only hold full reads, so use the plug from the replayed poll
+            data = smartplug._device_type_data
+        else:
+            data = _WiserRestController(self._wiser_api_connection)._get_hub_data(
+                WISERHUBDOMAIN + WISERSMARTPLUG.format(smartplug_id)
+            )
+        smartplug._device_type_data = data
+        smartplug._output_state = data.get("OutputState", TEXT_OFF)
+        return smartplug
+
+    def read_hub_data(
+        self, domain: bool = True, network: bool = True, schedule: bool = True
+    ):
+        """Read all data from hub and populate objects."""
+        self.read_timings = {}
+        if self.replay:
+            self._wiser_rest_controller = WiserReplayRestController(self._wiser_api_connection, self)
+        else:
+            self._wiser_rest_controller = WiserRestController(self._wiser_api_connection, self)
+
+        # Read data from hub
+        started = time.monotonic()
+        self.read_started = started
+        domain_data = self._wiser_rest_controller._get_hub_data(WISERHUBDOMAIN)
+        if self._probe_data:
+            # Reuse network data read when the config flow probed the hub
+            network_data = self._probe_data
+            self._probe_data = None
+            self.raw_data[HUB_ENDPOINTS[WISERHUBNETWORK]] = network_data
+            self.endpoint_timings.pop(HUB_ENDPOINTS[WISERHUBNETWORK], None)
+        else:
+            network_data = self._wiser_rest_controller._get_hub_data(WISERHUBNETWORK)
+        schedule_data = self._wiser_rest_controller._get_hub_data(WISERHUBSCHEDULES)
+        self.read_timings["network"] = time.monotonic() - started
+
+        # Build objects as WiserAPI.read_hub_data
+        started = time.monotonic()
+        self._schedules = _WiserScheduleCollection(self._wiser_rest_controller, schedule_data)
+        self._devices = _WiserDeviceCollection(self._wiser_rest_controller, domain_data, self._schedules)
+        self._system = _WiserSystem(
+            self._wiser_rest_controller, domain_data, network_data, domain_data.get("Device", [])
+        )
+        self._rooms = _WiserRoomCollection(
+            self._wiser_rest_controller, domain_data.get("Room", []), self._schedules, self._devices
+        )
+
+        if domain_data.get("HotWater"):
+            schedule = self._schedules.get_by_id(domain_data.get("HotWater")[0].get("ScheduleId", 0))
+            self._hotwater = _WiserHotwater(
+                self._wiser_rest_controller,
+                domain_data.get("HotWater", {})[0],
+                schedule,
+            )
+
+        if domain_data.get("HeatingChannel"):
+            self._heating_channels = _WiserHeatingChannelCollection(
+                domain_data.get("HeatingChannel"),
+                self._rooms
+            )
+
+        if domain_data.get("Moment"):
+            self._moments = _WiserMomentCollection(self._wiser_rest_controller, domain_data.get("Moment"))
+
+        self.read_timings["parse"] = time.monotonic() - started
+        return True
@@ -2,13 +2,12 @@
 from .const import (
     DATA,
     DOMAIN,
-    MANUFACTURER
+    PRIORITY_COMMAND,
 )
-from .climate import HVAC_MODE_HASS_TO_WISER
-from .helpers import get_device_name, get_unique_id, get_identifier
+from .command_queue import COMMAND_QUEUED
+from .helpers import get_device_name, get_unique_id
 
 from homeassistant.components.button import ButtonEntity
-from homeassistant.components.climate.const import HVAC_MODE_AUTO
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.util import dt as dt_util
 
@@ -54,6 +53,11 @@ class WiserButton(ButtonEntity):
         _LOGGER.debug(f"{self._name} requested hub update")
         await self._data.async_update(no_throttle=True)
 
+    @property
+    def available(self):
+        """Return if hub data is fresh enough to be trusted."""
+        return not self._data.is_stale
+
     @property
     def unique_id(self):
         """Return unique Id."""
@@ -66,14 +70,7 @@ class WiserButton(ButtonEntity):
     @property
     def device_info(self):
         """Return device specific attributes."""
-        return {
-                "name": get_device_name(self._data, 0),
-                "identifiers": {(DOMAIN, get_identifier(self._data, 0))},
-                "manufacturer": MANUFACTURER,
-                "model": self._data.wiserhub.system.model,
-                "sw_version": self._data.wiserhub.system.firmware_version,
-                "via_device": (DOMAIN, self._data.wiserhub.system.name),
-            }
+        return self._data.get_device_info(0)
 
 
     async def async_added_to_hass(self):
@@ -86,6 +83,7 @@ class WiserButton(ButtonEntity):
         async def async_update_state():
             """Update sensor state."""
             await self.async_update_ha_state(True)
+            self._data.record_state_write("button")
 
         self.async_on_remove(
             async_dispatcher_connect(
@@ -101,10 +99,11 @@ class WiserBoostAllHeatingButton(WiserButton):
     async def async_press(self):
         boost_time = self._data.boost_time
         boost_temp = self._data.boost_temp
-        await self.hass.async_add_executor_job(
-            self._data.wiserhub.system.boost_all_rooms, boost_temp, boost_time
+        result = await self._data.async_hub_command(
+            PRIORITY_COMMAND, "system.boost_all_rooms", self._data.wiserhub.system.boost_all_rooms, boost_temp, boost_time
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
 
     @property
     def icon(self):
@@ -116,10 +115,11 @@ class WiserCancelHeatingOverridesButton(WiserButton):
         super().__init__(data, "Cancel All Heating Overrides")
 
     async def async_press(self):
-        await self.hass.async_add_executor_job(
-            self._data.wiserhub.system.cancel_all_overrides
+        result = await self._data.async_hub_command(
+            PRIORITY_COMMAND, "system.cancel_all_overrides", self._data.wiserhub.system.cancel_all_overrides
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
 
     @property
     def icon(self):
@@ -132,10 +132,11 @@ class WiserBoostHotWaterButton(WiserButton):
 
     async def async_press(self):
         boost_time = self._data.hw_boost_time
-        await self.hass.async_add_executor_job(
-            self._data.wiserhub.hotwater.boost, boost_time
+        result = await self._data.async_hub_command(
+            PRIORITY_COMMAND, "hotwater.boost", self._data.wiserhub.hotwater.boost, boost_time
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
 
     @property
     def icon(self):
@@ -147,10 +148,11 @@ class WiserCancelHotWaterOverridesButton(WiserButton):
         super().__init__(data, "Cancel Hot Water Overrides")
 
     async def async_press(self):
-        await self.hass.async_add_executor_job(
-            self._data.wiserhub.hotwater.cancel_overrides
+        result = await self._data.async_hub_command(
+            PRIORITY_COMMAND, "hotwater.cancel_overrides", self._data.wiserhub.hotwater.cancel_overrides
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
 
     @property
     def icon(self):
@@ -162,11 +164,12 @@ class WiserOverrideHotWaterButton(WiserButton):
         super().__init__(data, "Toggle Hot Water")
 
     async def async_press(self):
-        await self.hass.async_add_executor_job(
-            self._data.wiserhub.hotwater.override_state, 
+        result = await self._data.async_hub_command(
+            PRIORITY_COMMAND, "hotwater.override_state", self._data.wiserhub.hotwater.override_state,
             "Off" if self._data.wiserhub.hotwater.current_state == "On" else "On"
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
 
     @property
     def icon(self):
@@ -175,13 +178,20 @@ class WiserOverrideHotWaterButton(WiserButton):
 
 class WiserMomentsButton(WiserButton):
     def __init__(self, data, moment_id):
+        self._moment_id = moment_id
         super().__init__(data, f"Moments {data.wiserhub.moments.get_by_id(moment_id).name}")
 
+    @property
+    def unique_id(self):
+        """Return unique Id."""
+        return get_unique_id(self._data, "button", "moment", self._moment_id)
+
     async def async_press(self):
-        await self.hass.async_add_executor_job(
-            self._data.wiserhub.moments.get_by_id(self.id).activate
+        result = await self._data.async_hub_command(
+            PRIORITY_COMMAND, "moment.activate", self._data.wiserhub.moments.get_by_id(self._moment_id).activate
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
 
     @property
     def icon(self):
@@ -32,21 +32,22 @@ from wiserHeatAPIv2.wiserhub import (
 )
 
 from .const import (
+    ATTR_COPYTO_ENTITY_ID,
+    ATTR_FILENAME,
+    ATTR_TIME_PERIOD,
     DATA,
     DOMAIN,
-    MANUFACTURER,
-    ROOM,
+    PRIORITY_COMMAND,
+    PRIORITY_SCHEDULE,
     WISER_BOOST_PRESETS,
-    WISER_SERVICES
+    WISER_SERVICES,
 )
-from .helpers import get_device_name, get_identifier
+from .command_queue import COMMAND_QUEUED
+from .helpers import WiserPendingState, get_device_name
 
 import logging
 _LOGGER = logging.getLogger(__name__)
 
-ATTR_COPYTO_ENTITY_ID = "to_entity_id"
-ATTR_FILENAME = "filename"
-ATTR_TIME_PERIOD = "time_period"
 ATTR_TEMPERATURE_DELTA = "temperature_delta"
 
 STATUS_AWAY = "Away Mode"
@@ -147,6 +148,7 @@ class WiserRoom(ClimateEntity):
         self._room_id = room_id
         self._room = self._data.wiserhub.rooms.get_by_id(self._room_id)
         self._hvac_modes_list = [modes for modes in HVAC_MODE_HASS_TO_WISER.keys()]
+        self._pending = WiserPendingState(self)
 
         _LOGGER.info(f"{self._data.wiserhub.system.name} {self.name} init")
 
@@ -155,11 +157,18 @@ class WiserRoom(ClimateEntity):
         _LOGGER.debug(f"{self._room.name} requested hub update")
         await self._data.async_update(no_throttle=True)
 
+    @property
+    def available(self):
+        """Return if hub data is fresh enough to be trusted."""
+        return not self._data.is_stale
+
     async def async_update(self):
         """Async update method."""
         self._room = self._data.wiserhub.rooms.get_by_id(self._room_id)
         if not self._room.is_boosted:
             self._boosted_time = 0
+        self._pending.reconcile("mode", self._room.mode)
+        self._pending.reconcile("target_temperature", self._room.current_target_temperature)
     
     @property
     def current_temperature(self):
@@ -176,18 +185,12 @@ class WiserRoom(ClimateEntity):
         """Return device specific attributes."""
         
         #identifier = f"{self.data.wiserhub.system.name}-WiserRoom-{self._room_id}-Wiser {self.data.wiserhub.rooms.get_by_id(self._room_id).name}"
-        return {
-                "name": get_device_name(self._data, self._room_id,"room"),
-                "identifiers": {(DOMAIN, get_identifier(self._data, self._room_id,"room"))},
-                "manufacturer": MANUFACTURER,
-                "model": ROOM.title(),
-                "via_device": (DOMAIN, self._data.wiserhub.system.name),
-            }
+        return self._data.get_device_info(self._room_id, "room")
 
     @property
     def icon(self):
         """Return icon to show if radiator is heating, not heating or set to off."""
-        if self._room.mode == "Off":
+        if self._pending.get("mode", self._room.mode) == "Off":
             return "mdi:radiator-off"
         elif self._room.is_heating:
             return "mdi:radiator"
@@ -204,15 +207,15 @@ class WiserRoom(ClimateEntity):
         """Return the list of available operation modes."""
         return self._hvac_modes_list
 
-    def set_hvac_mode(self, hvac_mode):
+    async def async_set_hvac_mode(self, hvac_mode):
         """Set new operation mode."""
         _LOGGER.debug(
             f"Setting HVAC mode to {hvac_mode} for {self._room.name}"
         )
-        self._room.mode = HVAC_MODE_HASS_TO_WISER[hvac_mode]
-        self.hass.async_create_task(
-            self.async_force_update()
-        )
+        mode = HVAC_MODE_HASS_TO_WISER[hvac_mode]
+        result = await self._pending.async_apply("mode", mode, "room.mode", setattr, self._room, "mode", mode)
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
         return True
 
     @property
@@ -255,21 +258,22 @@ class WiserRoom(ClimateEntity):
                 f"Setting Preset Mode {preset_mode} for {self._room.name}"
             )
         if preset_mode == "Advance Schedule":
-            await self.hass.async_add_executor_job(
-                self._room.schedule_advance
+            result = await self._data.async_hub_command(
+                PRIORITY_COMMAND, "room.schedule_advance", self._room.schedule_advance
             )
         elif WISER_PRESETS[preset_mode] == 0:
-            await self.hass.async_add_executor_job(
-                self._room.cancel_overrides
+            result = await self._data.async_hub_command(
+                PRIORITY_COMMAND, "room.cancel_overrides", self._room.cancel_overrides
             )
         else:
             boost_time = WISER_PRESETS[preset_mode]
             boost_temp = self._data.boost_temp
-            await self.hass.async_add_executor_job(
-                self._room.boost, boost_temp, boost_time
+            result = await self._data.async_hub_command(
+                PRIORITY_COMMAND, "room.boost", self._room.boost, boost_temp, boost_time
             )
         
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
         return True
 
     @property
@@ -280,7 +284,7 @@ class WiserRoom(ClimateEntity):
     @property
     def state(self):
         """Return state"""
-        return HVAC_MODE_WISER_TO_HASS[self._room.mode]
+        return HVAC_MODE_WISER_TO_HASS[self._pending.get("mode", self._room.mode)]
 
     @property
     def extra_state_attributes(self):
@@ -296,6 +300,7 @@ class WiserRoom(ClimateEntity):
         attrs["percentage_demand"] = self._room.percentage_demand
         attrs["control_output_state"] = "On" if self._room.is_heating else "Off"
         attrs["heating_rate"] = self._room.heating_rate
+        attrs["data_last_changed"] = self._data.freshness.last_changed("Room", self._room_id)
         attrs["window_state"] = self._room.window_state
         attrs["window_detection_active"] = self._room.window_detection_active
         attrs["away_mode_supressed"] = self._room.away_mode_suppressed
@@ -314,9 +319,9 @@ class WiserRoom(ClimateEntity):
     @property
     def target_temperature(self):
         """Return target temp."""
-        if self._room.mode == "Off":
+        if self._pending.get("mode", self._room.mode) == "Off":
             return None
-        return self._room.current_target_temperature
+        return self._pending.get("target_temperature", self._room.current_target_temperature)
 
     async def async_set_temperature(self, **kwargs):
         """Set new target temperatures."""
@@ -327,15 +332,22 @@ class WiserRoom(ClimateEntity):
 
         if self._data.setpoint_mode == "boost":
             _LOGGER.debug(f"Setting temperature for {self.name} to {target_temperature} using boost")
-            await self.hass.async_add_executor_job(
+            result = await self._pending.async_apply(
+                "target_temperature",
+                target_temperature,
+                "room.set_target_temperature_for_duration",
                 self._room.set_target_temperature_for_duration, target_temperature, self._data.boost_time
             )
         else:
             _LOGGER.debug(f"Setting temperature for {self.name} to {target_temperature}")
-            await self.hass.async_add_executor_job(
+            result = await self._pending.async_apply(
+                "target_temperature",
+                target_temperature,
+                "room.set_target_temperature",
                 self._room.set_target_temperature, target_temperature
             )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
         return True
 
     @property
@@ -346,32 +358,34 @@ class WiserRoom(ClimateEntity):
     @property
     def unique_id(self):
         """Return unique Id."""
-        return f"{self._data.wiserhub.system.name}-WiserRoom-{self._room_id}-{self.name}"
+        return f"{self._data.wiserhub.system.name}-WiserRoom-{self._room_id}"
 
     @callback
     async def async_boost_heating(self, time_period: int, temperature: float) -> None:
         """Boost heating for room"""
         _LOGGER.info(f"Boosting heating for {self._room.name} by {temperature}C for {time_period}m ")
-        await self.hass.async_add_executor_job(
-            self._room.boost, temperature, time_period
+        result = await self._data.async_hub_command(
+            PRIORITY_COMMAND, "room.boost", self._room.boost, temperature, time_period
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
 
     @callback
     async def async_advance_schedule(self) -> None:
         """Advance to next schedule setting for room"""
         _LOGGER.info(f"Advancing room schedule for  {self._room.name}")
-        await self.hass.async_add_executor_job(
-            self._room.schedule_advance
+        result = await self._data.async_hub_command(
+            PRIORITY_COMMAND, "room.schedule_advance", self._room.schedule_advance
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
 
     @callback
     async def async_get_schedule(self, filename: str) -> None:
         try:
             _LOGGER.info(f"Saving {self._room.name} schedule to file {filename}")
-            await self.hass.async_add_executor_job(
-                self._room.schedule.save_schedule_to_yaml_file, filename
+            await self._data.async_hub_command(
+                PRIORITY_SCHEDULE, "room.schedule.save_to_file", self._room.schedule.save_schedule_to_yaml_file, filename
             )
         except:
             _LOGGER.error(f"Saving {self._room.name} schedule to file {filename}")
@@ -380,8 +394,8 @@ class WiserRoom(ClimateEntity):
     async def async_set_schedule(self, filename: str) -> None:
         try:
             _LOGGER.info(f"Setting {self._room.name} schedule from file {filename}")
-            await self.hass.async_add_executor_job(
-                self._room.schedule.set_schedule_from_yaml_file, filename
+            await self._data.async_hub_command(
+                PRIORITY_SCHEDULE, "room.schedule.set_from_file", self._room.schedule.set_schedule_from_yaml_file, filename
             )
             await self.async_force_update()
         except:
@@ -393,8 +407,8 @@ class WiserRoom(ClimateEntity):
         try:
             # Add Check that to_entity is of same type as from_entity
             _LOGGER.info(f"Copying schedule from {self._room.name} to {to_room_name.title()}")
-            await self.hass.async_add_executor_job(
-                    self._room.schedule.copy_schedule, self._data.wiserhub.rooms.get_by_name(to_room_name).schedule.id
+            await self._data.async_hub_command(
+                    PRIORITY_SCHEDULE, "room.schedule.copy", self._room.schedule.copy_schedule, self._data.wiserhub.rooms.get_by_name(to_room_name).schedule.id
                 )
             await self.async_force_update()
         except:
@@ -406,9 +420,23 @@ class WiserRoom(ClimateEntity):
         async def async_update_state():
             """Update sensor state."""
             await self.async_update_ha_state(True)
+            self._data.record_state_write("climate")
 
         self.async_on_remove(
             async_dispatcher_connect(
                 self.hass, f"{self._data.wiserhub.system.name}-HubUpdateMessage", async_update_state
             )
         )
+
+        @callback
+        def async_update_boost_countdown():
+            """Update boost countdown from cached hub data."""
+            if self._room.is_boosted:
+                self.async_write_ha_state()
+                self._data.record_state_write("climate")
+
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, f"{self._data.wiserhub.system.name}-BoostTickMessage", async_update_boost_countdown
+            )
+        )
@@ -0,0 +1,144 @@
+"""
+Offline hub command queue for Wiser System.
+
+https://github.com/asantaga/wiserHomeAssistantPlatform
+msparker@sky.com
+"""
+from datetime import timedelta
+import json
+import logging
+
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    COMMAND_QUEUE_KINDS,
+    COMMAND_QUEUE_MERGE_KEYS,
+    COMMAND_QUEUE_SAVE_DELAY,
+    COMMAND_QUEUE_STORAGE_KEY,
+    COMMAND_QUEUE_STORAGE_VERSION,
+    COMMAND_QUEUE_TTL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Returned by hub commands that were queued rather than sent
+COMMAND_QUEUED = object()
+
+
+def is_hub_object(hub_object) -> bool:
+    """Return if an object is part of the hub api, so can be found again on replay."""
+    return type(hub_object).__module__.startswith("wiserHeatAPIv2")
+
+
+def get_command_object(wiserhub, command: str, object_id):
+    """Return the hub object a queued command applies to, or None if it no longer exists."""
+    kind = command.split(".")[0]
+    if kind == "room" and wiserhub.rooms:
+        return wiserhub.rooms.get_by_id(object_id)
+    if kind == "smartplug" and wiserhub.devices:
+        return wiserhub.devices.smartplugs.get_by_id(object_id)
+    if kind == "device" and wiserhub.devices:
+        return wiserhub.devices.get_by_id(object_id)
+    if kind == "moment" and wiserhub.moments:
+        return wiserhub.moments.get_by_id(object_id)
+    if kind == "hotwater":
+        return wiserhub.hotwater
+    if kind == "system":
+        return wiserhub.system
+    return None
+
+
+class WiserCommandQueue:
+    """Hub commands held while the hub is unreachable, kept across restarts."""
+
+    def __init__(self, hass, entry_id: str, ttl: int = COMMAND_QUEUE_TTL):
+        """Initialise an empty queue."""
+        self._store = Store(
+            hass, COMMAND_QUEUE_STORAGE_VERSION, COMMAND_QUEUE_STORAGE_KEY.format(entry_id)
+        )
+        self._ttl = ttl
+        # Latest command for each merge key, in order of when it was last queued
+        self._commands = {}
+
+    @staticmethod
+    def _get_key(record: dict) -> str:
+        """Return key under which later commands replace earlier ones."""
+        command = COMMAND_QUEUE_MERGE_KEYS.get(record["command"], record["command"])
+        return f"{command}-{record['object_id']}"
+
+    @property
+    def depth(self) -> int:
+        """Return number of queued commands."""
+        return len(self._commands)
+
+    async def async_load(self):
+        """Load commands queued before a restart."""
+        data = await self._store.async_load() or {}
+        for record in data.get("commands", []):
+            self._commands[self._get_key(record)] = record
+        if self._expire():
+            self._save()
+
+    async def async_remove(self):
+        """Remove stored commands."""
+        self._commands = {}
+        await self._store.async_remove()
+
+    def add(self, command: str, object_id, method: str, args: tuple) -> bool:
+        """Queue a command, replacing an earlier one for the same target."""
+        if command.split(".")[0] not in COMMAND_QUEUE_KINDS:
+            return False
+        try:
+            json.dumps(args)
+        except (TypeError, ValueError):
+            return False
+
+        record = {
+            "command": command,
+            "object_id": object_id,
+            "method": method,
+            "args": list(args),
+            "queued": dt_util.utcnow().isoformat(),
+        }
+        key = self._get_key(record)
+        self._commands.pop(key, None)
+        self._commands[key] = record
+        self._save()
+        return True
+
+    def pop_all(self) -> list:
+        """Return unexpired commands in the order to send them, emptying the queue."""
+        self._expire()
+        records = list(self._commands.values())
+        self._commands = {}
+        self._save()
+        return records
+
+    def _expire(self) -> bool:
+        """Drop commands queued longer than the ttl."""
+        cutoff = dt_util.utcnow() - timedelta(seconds=self._ttl)
+        expired = [
+            key for key, record in self._commands.items()
+            if dt_util.parse_datetime(record["queued"]) < cutoff
+        ]
+        for key in expired:
+            record = self._commands.pop(key)
+            _LOGGER.warning(
+                f"Dropping queued Wiser command {record['command']} from {record['queued']} as hub did not reconnect within {self._ttl}s"
+            )
+        return bool(expired)
+
+    def _save(self):
+        """Write the queue to storage shortly."""
+        self._store.async_delay_save(
+            lambda: {"commands": list(self._commands.values())}, COMMAND_QUEUE_SAVE_DELAY
+        )
+
+    def as_dict(self) -> dict:
+        """Return queued commands for diagnostics."""
+        return {
+            "depth": self.depth,
+            "ttl": self._ttl,
+            "commands": list(self._commands.values()),
+        }
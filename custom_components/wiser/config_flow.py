@@ -9,7 +9,6 @@ import requests.exceptions
 from typing import Any
 import voluptuous as vol
 from wiserHeatAPIv2.wiserhub import (
-    WiserAPI,
     WiserHubConnectionError,
     WiserHubAuthenticationError,
     WiserHubRESTError,
@@ -21,17 +20,31 @@ from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PASSWORD, CONF_SCAN_I
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
+from .api import probe_hub
 from .const import (
     CONF_HEATING_BOOST_TEMP,
     CONF_HEATING_BOOST_TIME,
+    CONF_LTS_DEMAND_DEADBAND,
+    CONF_LTS_MAX_INTERVAL,
+    CONF_LTS_MIN_INTERVAL,
     CONF_LTS_SENSORS,
+    CONF_LTS_TEMP_DEADBAND,
     CONF_MOMENTS,
+    CONF_RUNTIME_SENSORS,
     CONF_SETPOINT_MODE,
+    CONF_STALE_AFTER,
+    CONF_BACKGROUND_CONNECT,
+    CONF_TRACE_RECORDER,
     CONF_HW_BOOST_TIME,
     DEFAULT_BOOST_TEMP,
     DEFAULT_BOOST_TEMP_TIME,
+    DEFAULT_LTS_DEMAND_DEADBAND,
+    DEFAULT_LTS_MAX_INTERVAL,
+    DEFAULT_LTS_MIN_INTERVAL,
+    DEFAULT_LTS_TEMP_DEADBAND,
     DEFAULT_SCAN_INTERVAL,
     DEFAULT_SETPOINT_MODE,
+    DEFAULT_STALE_AFTER,
     DOMAIN,
 )
 
@@ -50,10 +63,11 @@ async def validate_input(hass, data):
     """
 
     try:
-        wiser = await hass.async_add_executor_job(
-            WiserAPI, data[CONF_HOST], data[CONF_PASSWORD],
+        wiser_id = await hass.async_add_executor_job(
+            probe_hub, data[CONF_HOST], data[CONF_PASSWORD],
         )
-        wiser_id = wiser.system.name
+        if not wiser_id:
+            raise UnknownError
 
     except WiserHubConnectionError:
         raise CannotConnect
@@ -79,10 +93,9 @@ class WiserFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
 
     The schema version of the entries that it creates
     Home Assistant will call your migrate method if the version changes
-    (this is not implemented yet)
     """
 
-    VERSION = 1
+    VERSION = 2
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_POLL
 
     def __init__(self):
@@ -139,8 +152,11 @@ class WiserFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         zctype = discovery_info.type
         name = discovery_info.name.replace(f".{zctype}", "")
 
+        # Update host of a configured hub, the running integration retargets in place
         await self.async_set_unique_id(get_unique_id(name))
-        self._abort_if_unique_id_configured()
+        self._abort_if_unique_id_configured(
+            updates={CONF_HOST: host}, reload_on_update=False
+        )
 
         self.context.update({"title_placeholders": {"name": name}})
 
@@ -239,12 +255,60 @@ class WiserOptionsFlowHandler(config_entries.OptionsFlow):
                         CONF_LTS_SENSORS, False
                     ),
                 ): bool,
+                vol.Optional(
+                    CONF_RUNTIME_SENSORS,
+                    default=self.config_entry.options.get(
+                        CONF_RUNTIME_SENSORS, False
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_LTS_TEMP_DEADBAND,
+                    default=self.config_entry.options.get(
+                        CONF_LTS_TEMP_DEADBAND, DEFAULT_LTS_TEMP_DEADBAND
+                    ),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_LTS_DEMAND_DEADBAND,
+                    default=self.config_entry.options.get(
+                        CONF_LTS_DEMAND_DEADBAND, DEFAULT_LTS_DEMAND_DEADBAND
+                    ),
+                ): vol.All(int, vol.Range(min=0, max=100)),
+                vol.Optional(
+                    CONF_LTS_MIN_INTERVAL,
+                    default=self.config_entry.options.get(
+                        CONF_LTS_MIN_INTERVAL, DEFAULT_LTS_MIN_INTERVAL
+                    ),
+                ): vol.All(int, vol.Range(min=0)),
+                vol.Optional(
+                    CONF_LTS_MAX_INTERVAL,
+                    default=self.config_entry.options.get(
+                        CONF_LTS_MAX_INTERVAL, DEFAULT_LTS_MAX_INTERVAL
+                    ),
+                ): vol.All(int, vol.Range(min=0)),
                 vol.Optional(
                     CONF_SETPOINT_MODE,
                     default=self.config_entry.options.get(
                         CONF_SETPOINT_MODE, DEFAULT_SETPOINT_MODE
                     ),
                 ): vol.In([DEFAULT_SETPOINT_MODE, "boost"]),
+                vol.Optional(
+                    CONF_STALE_AFTER,
+                    default=self.config_entry.options.get(
+                        CONF_STALE_AFTER, DEFAULT_STALE_AFTER
+                    ),
+                ): vol.All(int, vol.Range(min=0)),
+                vol.Optional(
+                    CONF_BACKGROUND_CONNECT,
+                    default=self.config_entry.options.get(
+                        CONF_BACKGROUND_CONNECT, False
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_TRACE_RECORDER,
+                    default=self.config_entry.options.get(
+                        CONF_TRACE_RECORDER, False
+                    ),
+                ): bool,
             }
         )
         return self.async_show_form(step_id="init", data_schema=data_schema)
@@ -27,6 +27,86 @@ DEFAULT_BOOST_TEMP = 2
 DEFAULT_BOOST_TEMP_TIME = 60
 DEFAULT_SCAN_INTERVAL = 30
 DEFAULT_SETPOINT_MODE = "normal"
+DEFAULT_LTS_TEMP_DEADBAND = 0.1
+DEFAULT_LTS_DEMAND_DEADBAND = 1
+DEFAULT_LTS_MIN_INTERVAL = 60
+DEFAULT_LTS_MAX_INTERVAL = 900
+
+# Seconds after a known boost expiry or schedule change to refresh from the hub
+DEADLINE_REFRESH_DELAY = 5
+# How far ahead to arm deadline refreshes
+DEADLINE_LOOKAHEAD = 24 * 60 * 60
+# Seconds between local boost countdown updates
+BOOST_TICK_INTERVAL = 60
+# Seconds before first smartplug state check after a command, doubling each check
+SMARTPLUG_CONFIRM_DELAY = 0.25
+# Seconds to wait for a smartplug to report the commanded state
+SMARTPLUG_CONFIRM_TIMEOUT = 8
+
+# Longest gap between samples counted as heating runtime, in seconds
+RUNTIME_MAX_SAMPLE_GAP = 600
+# Days of daily heating runtime kept
+RUNTIME_HISTORY_DAYS = 31
+
+# Seconds of zigbee signal history kept per device
+SIGNAL_HISTORY_DURATION = 24 * 60 * 60
+SIGNAL_HISTORY_SAMPLE_INTERVAL = 60
+SIGNAL_HISTORY_PERCENTILES = [5, 50, 95]
+
+# Seconds between background connection attempts, doubling up to the maximum
+CONNECT_RETRY_INTERVAL = 30
+CONNECT_RETRY_MAX_INTERVAL = 600
+
+# Commands held while the hub is unreachable, kept for ttl seconds and replayed on reconnection
+COMMAND_QUEUE_TTL = 15 * 60
+COMMAND_QUEUE_STORAGE_KEY = "wiser.command_queue.{}"
+COMMAND_QUEUE_STORAGE_VERSION = 1
+COMMAND_QUEUE_SAVE_DELAY = 1
+COMMAND_QUEUE_KINDS = ["room", "smartplug", "device", "hotwater", "system", "moment"]
+# Commands that replace each other when queued for the same target
+COMMAND_QUEUE_MERGE_KEYS = {
+    "smartplug.turn_on": "smartplug.state",
+    "smartplug.turn_off": "smartplug.state",
+    "room.set_target_temperature": "room.target_temperature",
+    "room.set_target_temperature_for_duration": "room.target_temperature",
+}
+
+# Seconds a config flow probe of the hub is reused by the first hub read
+PROBE_CACHE_TTL = 60
+
+# Seconds without a successful hub update before entities are unavailable, 0 to disable
+DEFAULT_STALE_AFTER = 0
+
+# Number of recent polls kept for diagnostics
+DIAGNOSTICS_POLL_HISTORY = 20
+
+# Hub trace recorder file, size in bytes before rotating and rotated files kept
+TRACE_FILE = "wiser_trace_{}.jsonl.gz"
+TRACE_MAX_BYTES = 5 * 1024 * 1024
+TRACE_BACKUP_COUNT = 3
+
+# Host prefix to replay a recorded hub trace, e.g. replay:/config/trace.jsonl.gz?speed=1440
+REPLAY_HOST_PREFIX = "replay:"
+REPLAY_SPEED_PARAM = "?speed="
+EVENT_REPLAY_COMPLETE = "wiser_replay_complete"
+
+# Event with per hub results of services run across all hubs
+EVENT_SERVICE_RESULT = "wiser_service_result"
+
+# Prometheus metrics
+METRICS_URL = "/api/wiser/metrics"
+METRICS_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Hub job priorities, lower values run first
+PRIORITY_COMMAND = 0
+PRIORITY_POLL = 1
+PRIORITY_SCHEDULE = 2
+HUB_JOB_PRIORITIES = {
+    PRIORITY_COMMAND: "command",
+    PRIORITY_POLL: "poll",
+    PRIORITY_SCHEDULE: "schedule",
+}
+HUB_EXECUTOR_WORKERS = 2
 
 # Custom Configs
 CONF_HEATING_BOOST_TEMP = "heating_boost_temp"
@@ -35,8 +115,19 @@ CONF_HW_BOOST_TIME = "hotwater_boost_time"
 CONF_SETPOINT_MODE = "setpoint_mode"
 CONF_MOMENTS = "moments"
 CONF_LTS_SENSORS = "lts_sensors"
+CONF_LTS_TEMP_DEADBAND = "lts_temp_deadband"
+CONF_LTS_DEMAND_DEADBAND = "lts_demand_deadband"
+CONF_LTS_MIN_INTERVAL = "lts_min_interval"
+CONF_LTS_MAX_INTERVAL = "lts_max_interval"
+CONF_RUNTIME_SENSORS = "runtime_sensors"
+CONF_TRACE_RECORDER = "trace_recorder"
+CONF_STALE_AFTER = "stale_after"
+CONF_BACKGROUND_CONNECT = "background_connect"
+CONF_HUB_ID = "wiser_hub_id"
 
 # Custom Attributes
+ATTR_COPYTO_ENTITY_ID = "to_entity_id"
+ATTR_FILENAME = "filename"
 ATTR_TIME_PERIOD = "time_period"
 
 # Signal icons
@@ -0,0 +1,80 @@
+"""
+Diagnostics support for Wiser System.
+
+https://github.com/asantaga/wiserHomeAssistantPlatform
+msparker@sky.com
+"""
+import json
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.helpers import entity_registry as er
+
+from .const import DATA, DOMAIN
+
+TO_REDACT = {
+    "BootStrapApiHost",
+    "HostName",
+    "IPv4Address",
+    "IPv4DefaultGateway",
+    "IPv4HostAddress",
+    "IPv4PrimaryDNS",
+    "IPv4SecondaryDNS",
+    "IPv4SubnetMask",
+    "Latitude",
+    "Longitude",
+    "MacAddress",
+    "SerialNumber",
+    "SSID",
+    "WiserApiHost",
+    "ZigbeeEUI",
+}
+
+
+async def async_get_config_entry_diagnostics(hass, config_entry) -> dict:
+    """Return diagnostics for a config entry."""
+    data = hass.data[DOMAIN][config_entry.entry_id][DATA]
+    raw_data = data.wiserhub.raw_data if data.wiserhub else {}
+    endpoint_timings = data.wiserhub.endpoint_timings if data.wiserhub else {}
+
+    entity_counts = {}
+    for entity in er.async_entries_for_config_entry(
+        er.async_get(hass), config_entry.entry_id
+    ):
+        entity_counts[entity.domain] = entity_counts.get(entity.domain, 0) + 1
+
+    snapshot_sizes = {
+        endpoint: len(json.dumps(payload))
+        for endpoint, payload in raw_data.items()
+    }
+
+    return {
+        "snapshot": async_redact_data(raw_data, TO_REDACT),
+        "snapshot_sizes": snapshot_sizes,
+        "entity_counts": entity_counts,
+        "timings": {
+            "startup": data.startup_timings,
+            "polls": list(data.poll_timings),
+            "last_read_endpoints": {
+                endpoint: round(duration, 3)
+                for endpoint, duration in endpoint_timings.items()
+            },
+        },
+        "executor": {
+            "queue_depth": data.executor.queue_depth,
+            "wait_stats": data.executor.wait_stats,
+        },
+        "commands": {
+            "latency": data.metrics.get_histograms("wiser_command_duration_seconds"),
+            "failures": data.metrics.get_counters("wiser_command_failures_total"),
+        },
+        "command_queue": data.command_queue.as_dict(),
+        "freshness": {
+            "last_refreshed": data.last_refreshed.isoformat() if data.last_refreshed else None,
+            "last_attempted": data.last_attempted.isoformat() if data.last_attempted else None,
+            "consecutive_failures": data.consecutive_failures,
+            "stale_after": data.stale_after,
+            "objects_last_changed": data.freshness.as_dict(),
+        },
+        "topology": data.topology.as_dict(),
+        "signal_history": data.signal_history.as_dict(),
+    }
@@ -0,0 +1,110 @@
+"""
+Dedicated executor for Wiser Hub I/O.
+
+https://github.com/asantaga/wiserHomeAssistantPlatform
+msparker@sky.com
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import logging
+import time
+
+from .const import HUB_EXECUTOR_WORKERS, HUB_JOB_PRIORITIES
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WiserHubExecutor:
+    """Run hub jobs on dedicated worker threads, highest priority first."""
+
+    def __init__(self, hass, name: str, workers: int = HUB_EXECUTOR_WORKERS):
+        """Initialise the executor and start its workers."""
+        self._hass = hass
+        self._name = name
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"wiser-{name}"
+        )
+        self._queue = asyncio.PriorityQueue()
+        self._sequence = itertools.count()
+        self._shutdown = False
+        self._wait_stats = {
+            priority: {"jobs": 0, "total_wait": 0.0, "max_wait": 0.0, "last_wait": 0.0}
+            for priority in HUB_JOB_PRIORITIES
+        }
+        # Workers live for the life of the config entry so are not tracked by hass
+        self._workers = [
+            hass.loop.create_task(self._async_worker()) for _ in range(workers)
+        ]
+
+    @property
+    def queue_depth(self) -> int:
+        """Return number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    @property
+    def wait_stats(self) -> dict:
+        """Return queue wait time statistics by job priority."""
+        stats = {}
+        for priority, values in self._wait_stats.items():
+            stats[HUB_JOB_PRIORITIES[priority]] = {
+                "jobs": values["jobs"],
+                "average_wait": round(values["total_wait"] / values["jobs"], 3) if values["jobs"] else 0,
+                "max_wait": round(values["max_wait"], 3),
+                "last_wait": round(values["last_wait"], 3),
+            }
+        return stats
+
+    async def async_add_job(self, priority: int, target, *args):
+        """Queue a hub job and return its result once run."""
+        if self._shutdown:
+            raise RuntimeError(f"Hub executor for {self._name} is shut down")
+        future = self._hass.loop.create_future()
+        self._queue.put_nowait(
+            (priority, next(self._sequence), time.monotonic(), target, args, future)
+        )
+        return await future
+
+    async def _async_worker(self):
+        """Run queued jobs in priority order."""
+        while True:
+            priority, _, queued, target, args, future = await self._queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                self._record_wait(priority, time.monotonic() - queued)
+                try:
+                    result = await self._hass.loop.run_in_executor(
+                        self._executor, target, *args
+                    )
+                except asyncio.CancelledError:
+                    # Shut down mid job, so do not leave its caller waiting
+                    future.cancel()
+                    raise
+                except Exception as ex:  # pylint: disable=broad-except
+                    if not future.done():
+                        future.set_exception(ex)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    def _record_wait(self, priority: int, wait: float):
+        stats = self._wait_stats[priority]
+        stats["jobs"] += 1
+        stats["total_wait"] += wait
+        stats["max_wait"] = max(stats["max_wait"], wait)
+        stats["last_wait"] = wait
+
+    def shutdown(self):
+        """Stop workers and fail any jobs still waiting."""
+        self._shutdown = True
+        for worker in self._workers:
+            worker.cancel()
+        while not self._queue.empty():
+            *_, future = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+        self._executor.shutdown(wait=False)
+        _LOGGER.debug(f"Hub executor for {self._name} shut down")
@@ -0,0 +1,45 @@
+"""
+Hub data freshness tracking for Wiser System.
+
+https://github.com/asantaga/wiserHomeAssistantPlatform
+msparker@sky.com
+"""
+# Domain collections tracked per object
+FRESHNESS_COLLECTIONS = [
+    "Room",
+    "Device",
+    "SmartValve",
+    "RoomStat",
+    "SmartPlug",
+    "HotWater",
+    "HeatingChannel",
+]
+
+
+class WiserFreshness:
+    """Track when each hub object's data last changed."""
+
+    def __init__(self):
+        """Initialise with no objects seen."""
+        self._data = {}
+        self._last_changed = {}
+
+    def update(self, domain_data: dict, now):
+        """Compare each object with the previous poll and stamp those changed."""
+        for collection in FRESHNESS_COLLECTIONS:
+            for item in domain_data.get(collection, []):
+                key = (collection, item.get("id"))
+                if self._data.get(key) != item:
+                    self._data[key] = item
+                    self._last_changed[key] = now
+
+    def last_changed(self, collection: str, object_id: int):
+        """Return when an object's data last changed, or None if never seen."""
+        return self._last_changed.get((collection, object_id))
+
+    def as_dict(self) -> dict:
+        """Return last changed times of all objects."""
+        result = {}
+        for (collection, object_id), changed in self._last_changed.items():
+            result.setdefault(collection, {})[object_id] = changed.isoformat()
+        return result
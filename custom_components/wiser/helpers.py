@@ -1,4 +1,15 @@
-from .const import ENTITY_PREFIX
+from datetime import timedelta
+import logging
+import time
+
+from homeassistant.core import callback
+from homeassistant.util import dt as dt_util
+
+from .const import ENTITY_PREFIX, PRIORITY_COMMAND
+
+_LOGGER = logging.getLogger(__name__)
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
 def get_device_name(data, id, type = "device"):
     if type == "device":
@@ -25,7 +36,10 @@ def get_device_name(data, id, type = "device"):
     
 
 def get_identifier(data, id, type = "device"):
-    return f"{data.wiserhub.system.name} {get_device_name(data, id, type)}"
+    # Rooms and devices are keyed by id so renaming them keeps the same registry device
+    if type == "device" and id == 0:
+        return f"{data.wiserhub.system.name} {get_device_name(data, id, type)}"
+    return f"{data.wiserhub.system.name}-{type}-{id}"
 
 def get_unique_id(data, device_type, entity_type, id):
     return f"{data.wiserhub.system.name}-{device_type}-{entity_type}-{id}"
@@ -33,3 +47,79 @@ def get_unique_id(data, device_type, entity_type, id):
 def get_room_name(data, room_id):
     return f"{ENTITY_PREFIX} {data.wiserhub.rooms.get_by_id(room_id).name}"
 
+
+
+def get_next_schedule_datetime(schedule_next):
+    """Return the local datetime of the next schedule entry, or None if unknown."""
+    try:
+        day, next_time = schedule_next.day, schedule_next.time
+    except (AttributeError, ValueError):
+        # Schedules without a Next entry wrap None
+        return None
+    if day not in WEEKDAYS:
+        return None
+    now = dt_util.now()
+    next_datetime = now.replace(
+        hour=next_time.hour, minute=next_time.minute, second=0, microsecond=0
+    ) + timedelta(days=(WEEKDAYS.index(day) - now.weekday()) % 7)
+    if next_datetime <= now:
+        next_datetime += timedelta(days=7)
+    return next_datetime
+
+def get_utc_datetime(local_datetime):
+    """Convert a naive hub timestamp (system local time) to a utc datetime."""
+    return dt_util.utc_from_timestamp(local_datetime.timestamp())
+
+
+class WiserPendingState:
+    """Optimistic entity values awaiting confirmation from the hub."""
+
+    def __init__(self, entity):
+        self._entity = entity
+        self._pending = {}
+
+    def get(self, key, hub_value):
+        """Return the pending value for key if there is one, otherwise the hub value."""
+        if key in self._pending:
+            return self._pending[key][0]
+        return hub_value
+
+    @callback
+    def async_set(self, key, value):
+        """Show value immediately while the command is sent to the hub."""
+        self._pending[key] = (value, time.monotonic())
+        self._entity.async_write_ha_state()
+
+    @callback
+    def async_rollback(self, key):
+        """Drop a pending value and show the hub value again."""
+        if self._pending.pop(key, None) is not None:
+            self._entity.async_write_ha_state()
+
+    async def async_apply(self, key, value, command, target, *args):
+        """Set value optimistically and run the hub command, rolling back if it fails."""
+        self.async_set(key, value)
+        try:
+            result = await self._entity._data.async_hub_command(PRIORITY_COMMAND, command, target, *args)
+        except Exception:
+            self.async_rollback(key)
+            raise
+        # Reads running alongside the command may predate it, so only trust later ones
+        if self._pending.get(key, (None,))[0] == value:
+            self._pending[key] = (value, time.monotonic())
+        return result
+
+    def reconcile(self, key, hub_value):
+        """Confirm or roll back a pending value against the latest hub snapshot."""
+        if key not in self._pending:
+            return
+        value, issued = self._pending[key]
+        # Ignore snapshots read before the command was issued
+        snapshot_time = self._entity._data.snapshot_time
+        if snapshot_time is None or snapshot_time < issued:
+            return
+        del self._pending[key]
+        if hub_value != value:
+            _LOGGER.warning(
+                f"{self._entity.name} {key} reported as {hub_value} by hub but {value} was requested. Rolling back"
+            )
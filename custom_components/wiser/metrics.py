@@ -0,0 +1,162 @@
+"""
+Prometheus metrics for Wiser System.
+
+https://github.com/asantaga/wiserHomeAssistantPlatform
+msparker@sky.com
+"""
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView
+
+from .const import DATA, DOMAIN, METRICS_LATENCY_BUCKETS, METRICS_URL
+
+# name: (type, help)
+METRICS = {
+    "wiser_polls_total": ("counter", "Hub polls by result"),
+    "wiser_poll_duration_seconds": ("histogram", "Hub poll latency"),
+    "wiser_poll_errors_total": ("counter", "Hub poll errors by exception class"),
+    "wiser_hub_job_duration_seconds": ("histogram", "Hub job latency including queue wait by type"),
+    "wiser_command_duration_seconds": ("histogram", "Hub command latency by command"),
+    "wiser_command_failures_total": ("counter", "Hub command failures by command and exception class"),
+    "wiser_dispatches_total": ("counter", "Update signals sent to entities"),
+    "wiser_dispatch_deliveries_total": ("counter", "Update signals received by entities by platform"),
+    "wiser_state_writes_total": ("counter", "Entity state writes by platform"),
+    "wiser_state_writes_skipped_total": ("counter", "Entity state writes skipped by platform"),
+    "wiser_hub_queue_depth": ("gauge", "Hub jobs waiting for a worker"),
+    "wiser_command_queue_depth": ("gauge", "Commands queued while the hub is unreachable"),
+    "wiser_data_age_seconds": ("gauge", "Seconds since the last successful hub update"),
+}
+
+
+class WiserHistogram:
+    """Fixed bucket histogram."""
+
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS):
+        """Initialise empty buckets."""
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """Add an observation."""
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def as_dict(self) -> dict:
+        """Return cumulative bucket counts, count and sum."""
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"buckets": buckets, "count": self.count, "sum": round(self.sum, 3)}
+
+
+class WiserMetrics:
+    """Counters and histograms for a hub, updated in place."""
+
+    def __init__(self):
+        """Initialise empty metrics."""
+        self._counters = {}
+        self._histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increment a counter."""
+        key = self._key(name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Add an observation to a histogram."""
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = WiserHistogram()
+        histogram.observe(value)
+
+    def get_counters(self, name: str) -> list:
+        """Return labels and value of each counter with a name."""
+        return [
+            {**dict(labels), "value": value}
+            for (counter, labels), value in self._counters.items()
+            if counter == name
+        ]
+
+    def get_histograms(self, name: str) -> list:
+        """Return labels and values of each histogram with a name."""
+        return [
+            {**dict(labels), **histogram.as_dict()}
+            for (histogram_name, labels), histogram in self._histograms.items()
+            if histogram_name == name
+        ]
+
+    def samples(self, gauges: dict = None):
+        """Yield metric family, sample name, labels and value of every sample."""
+        for (name, labels), value in self._counters.items():
+            yield name, name, labels, value
+        for (name, labels), histogram in self._histograms.items():
+            values = histogram.as_dict()
+            for bound, count in values["buckets"].items():
+                yield name, f"{name}_bucket", labels + (("le", str(bound)),), count
+            yield name, f"{name}_bucket", labels + (("le", "+Inf"),), values["count"]
+            yield name, f"{name}_count", labels, values["count"]
+            yield name, f"{name}_sum", labels, values["sum"]
+        for name, value in (gauges or {}).items():
+            yield name, name, (), value
+
+
+def _format_labels(labels) -> str:
+    """Return labels in prometheus text format."""
+    formatted = []
+    for label, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        formatted.append(f'{label}="{value}"')
+    return "{" + ",".join(formatted) + "}"
+
+
+def render_metrics(handles) -> str:
+    """Render metrics of all hubs in prometheus text format."""
+    families = {name: [] for name in METRICS}
+    for handle in handles:
+        hub = (("hub", handle.wiserhub.system.name),) if handle.wiserhub else ()
+        gauges = {
+            "wiser_hub_queue_depth": handle.executor.queue_depth,
+            "wiser_command_queue_depth": handle.command_queue.depth,
+        }
+        if handle.data_age is not None:
+            gauges["wiser_data_age_seconds"] = round(handle.data_age, 1)
+        for family, name, labels, value in handle.metrics.samples(gauges):
+            families.setdefault(family, []).append((name, hub + labels, value))
+
+    lines = []
+    for family, samples in families.items():
+        if not samples:
+            continue
+        metric_type, description = METRICS.get(family, ("untyped", ""))
+        lines.append(f"# HELP {family} {description}")
+        lines.append(f"# TYPE {family} {metric_type}")
+        for name, labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels) if labels else ''} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class WiserMetricsView(HomeAssistantView):
+    """Serve integration metrics to prometheus."""
+
+    url = METRICS_URL
+    name = "api:wiser:metrics"
+
+    async def get(self, request):
+        """Return metrics of all configured hubs."""
+        hass = request.app["hass"]
+        handles = [entry[DATA] for entry in hass.data.get(DOMAIN, {}).values() if DATA in entry]
+        return web.Response(
+            text=render_metrics(handles), content_type="text/plain", charset="utf-8"
+        )
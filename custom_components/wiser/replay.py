@@ -0,0 +1,93 @@
+"""
+Replay of recorded hub traces for Wiser System.
+
+https://github.com/asantaga/wiserHomeAssistantPlatform
+msparker@sky.com
+"""
+import gzip
+import json
+import logging
+
+from homeassistant.util import dt as dt_util
+from wiserHeatAPIv2.exceptions import WiserHubConnectionError
+
+from .const import REPLAY_HOST_PREFIX, REPLAY_SPEED_PARAM
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def parse_replay_host(host: str):
+    """Return trace path and speed from a replay host, or None if not a replay host."""
+    if not host or not host.startswith(REPLAY_HOST_PREFIX):
+        return None
+    path, _, speed = host[len(REPLAY_HOST_PREFIX):].partition(REPLAY_SPEED_PARAM)
+    try:
+        return path, max(float(speed), 0.001) if speed else 1.0
+    except ValueError as ex:
+        raise WiserHubConnectionError(f"Invalid replay speed {speed}") from ex
+
+
+class WiserTraceReplay:
+    """Poll records of a hub trace, served in recorded order."""
+
+    def __init__(self, path: str, speed: float = 1.0):
+        """Open the trace and load the first recorded poll."""
+        self.path = path
+        self.speed = speed
+        self.polls = 0
+        try:
+            self._file = gzip.open(path, "rt", encoding="utf-8")
+        except OSError as ex:
+            raise WiserHubConnectionError(f"Unable to open replay trace {path}: {ex}") from ex
+        self._next = self._read_poll()
+        self.current = None
+        if not self.advance():
+            raise WiserHubConnectionError(f"Replay trace {path} has no hub data")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the trace file."""
+        self._file.close()
+
+    def _read_poll(self):
+        """Return the next poll record in the trace, or None at the end."""
+        try:
+            for line in self._file:
+                record = json.loads(line)
+                if record.get("type") == "poll":
+                    record["time"] = dt_util.parse_datetime(record["time"])
+                    return record
+        except (OSError, EOFError, ValueError) as ex:
+            _LOGGER.warning(f"Stopped reading replay trace {self.path}: {ex}")
+        self._file.close()
+        return None
+
+    @property
+    def finished(self) -> bool:
+        """Return if all recorded polls have been served."""
+        return self._next is None
+
+    @property
+    def next_delay(self):
+        """Return seconds until the next poll at replay speed, or None at the end."""
+        if self._next is None:
+            return None
+        return max((self._next["time"] - self.current["time"]).total_seconds(), 0) / self.speed
+
+    def advance(self) -> bool:
+        """Move to the next recorded poll."""
+        if self._next is None:
+            return False
+        self.current = self._next
+        self._next = self._read_poll()
+        self.polls += 1
+        return True
+
+    def get_data(self, endpoint: str) -> dict:
+        """Return the recorded payload of an endpoint for the current poll."""
+        return self.current["data"].get(endpoint, {})
@@ -1,22 +1,21 @@
 import logging
 from .const import (
+    ATTR_COPYTO_ENTITY_ID,
+    ATTR_FILENAME,
     ATTR_TIME_PERIOD,
     DATA,
     DEFAULT_BOOST_TEMP_TIME,
     DOMAIN,
-    MANUFACTURER,
-    WISER_SERVICES
-)
-from .climate import (
-    ATTR_COPYTO_ENTITY_ID,
-    ATTR_FILENAME
+    PRIORITY_COMMAND,
+    PRIORITY_SCHEDULE,
+    WISER_SERVICES,
 )
-from .helpers import get_device_name, get_unique_id, get_identifier
+from .command_queue import COMMAND_QUEUED
+from .helpers import WiserPendingState, get_device_name, get_unique_id
 
 import voluptuous as vol
 from homeassistant.const import ATTR_MODE
 from homeassistant.components.select import SelectEntity
-from homeassistant.components.water_heater import SUPPORT_OPERATION_MODE
 from homeassistant.core import callback
 from homeassistant.helpers import config_validation as cv, entity_platform
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
@@ -100,11 +99,17 @@ class WiserSelectEntity(SelectEntity):
     def __init__(self, data):
         """Initialize the sensor."""
         self._data = data
+        self._pending = WiserPendingState(self)
         _LOGGER.info(f"{self._data.wiserhub.system.name} {self.name} initalise")
 
     async def async_force_update(self):
         await self._data.async_update(no_throttle=True)
 
+    @property
+    def available(self):
+        """Return if hub data is fresh enough to be trusted."""
+        return not self._data.is_stale
+
     @property
     def should_poll(self):
         """We don't want polling so return false."""
@@ -145,6 +150,7 @@ class WiserSelectEntity(SelectEntity):
         async def async_update_state():
             """Update sensor state."""
             await self.async_update_ha_state(True)
+            self._data.record_state_write("select")
 
         self.async_on_remove(
             async_dispatcher_connect(
@@ -164,6 +170,7 @@ class WiserHotWaterModeSelect(WiserSelectEntity):
     async def async_update(self):
         """Async update method."""
         self._hotwater = self._data.wiserhub.hotwater
+        self._pending.reconcile("option", self._hotwater.mode)
     
     @property
     def name(self):
@@ -172,13 +179,16 @@ class WiserHotWaterModeSelect(WiserSelectEntity):
 
     @property
     def current_option(self) -> str:
-        return self._hotwater.mode
+        return self._pending.get("option", self._hotwater.mode)
 
-    def select_option(self, option: str) -> None:
-        _LOGGER.debug("Setting hot water mode to {option}")
-        self._hotwater.mode = option
-        self._hotwater.cancel_overrides()
-        self.hass.async_create_task(self.async_force_update())
+    async def async_select_option(self, option: str) -> None:
+        _LOGGER.debug(f"Setting hot water mode to {option}")
+        await self._pending.async_apply("option", option, "hotwater.mode", setattr, self._hotwater, "mode", option)
+        result = await self._data.async_hub_command(
+            PRIORITY_COMMAND, "hotwater.cancel_overrides", self._hotwater.cancel_overrides
+        )
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
 
     @property
     def unique_id(self):
@@ -188,37 +198,28 @@ class WiserHotWaterModeSelect(WiserSelectEntity):
     @property
     def device_info(self):
         """Return device specific attributes."""
-        return {
-                "name": get_device_name(self._data, 0),
-                "identifiers": {(DOMAIN, get_identifier(self._data, 0))},
-                "manufacturer": MANUFACTURER,
-                "model": self._data.wiserhub.system.model,
-                "sw_version": self._data.wiserhub.system.firmware_version,
-                "via_device": (DOMAIN, self._data.wiserhub.system.name),
-            }
+        return self._data.get_device_info(0)
 
     @callback
     async def async_set_mode(self, mode):
         _LOGGER.info(f"Setting Hot Water to {mode} mode")
-        await self.hass.async_add_executor_job(
-            self.select_option, mode
-        )
-        await self.async_force_update()
+        await self.async_select_option(mode)
 
     @callback
     async def async_boost(self, time_period: int):
         _LOGGER.info(f"Boosting Hot Water for {time_period}m")
-        await self.hass.async_add_executor_job(
-            self._data.wiserhub.hotwater.boost, time_period
+        result = await self._data.async_hub_command(
+            PRIORITY_COMMAND, "hotwater.boost", self._data.wiserhub.hotwater.boost, time_period
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
 
     @callback
     async def async_get_schedule(self, filename: str) -> None:
         try:
             _LOGGER.info(f"Saving hot water schedule to file {filename}")
-            await self.hass.async_add_executor_job(
-                self._data.wiserhub.hotwater.schedule.save_schedule_to_yaml_file, filename
+            await self._data.async_hub_command(
+                PRIORITY_SCHEDULE, "hotwater.schedule.save_to_file", self._data.wiserhub.hotwater.schedule.save_schedule_to_yaml_file, filename
             )
         except Exception as ex:
             _LOGGER.error(f"Error saving hotwater schedule to file {filename}.  Error is {ex}")
@@ -227,8 +228,8 @@ class WiserHotWaterModeSelect(WiserSelectEntity):
     async def async_set_schedule(self, filename: str) -> None:
         try:
             _LOGGER.info(f"Setting hotwater schedule from file {filename}")
-            await self.hass.async_add_executor_job(
-                self._data.wiserhub.hotwater.schedule.set_schedule_from_yaml_file, filename
+            await self._data.async_hub_command(
+                PRIORITY_SCHEDULE, "hotwater.schedule.set_from_file", self._data.wiserhub.hotwater.schedule.set_schedule_from_yaml_file, filename
             )
             await self.async_force_update()
         except Exception as ex:
@@ -248,6 +249,7 @@ class WiserSmartPlugModeSelect(WiserSelectEntity):
     async def async_update(self):
         """Async update method."""
         self._smartplug = self._data.wiserhub.devices.smartplugs.get_by_id(self._smartplug_id)
+        self._pending.reconcile("option", self._smartplug.mode)
     
     @property
     def name(self):
@@ -256,12 +258,13 @@ class WiserSmartPlugModeSelect(WiserSelectEntity):
 
     @property
     def current_option(self) -> str:
-        return self._smartplug.mode
+        return self._pending.get("option", self._smartplug.mode)
 
-    def select_option(self, option: str) -> None:
-        _LOGGER.debug("Setting smartplug mode to {option}")
-        self._smartplug.mode = option
-        self.hass.async_create_task(self.async_force_update())
+    async def async_select_option(self, option: str) -> None:
+        _LOGGER.debug(f"Setting smartplug mode to {option}")
+        result = await self._pending.async_apply("option", option, "smartplug.mode", setattr, self._smartplug, "mode", option)
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
     
     @property
     def unique_id(self):
@@ -271,30 +274,20 @@ class WiserSmartPlugModeSelect(WiserSelectEntity):
     @property
     def device_info(self):
         """Return device specific attributes."""
-        return {
-                "name": get_device_name(self._data, self._smartplug_id),
-                "identifiers": {(DOMAIN, get_identifier(self._data, self._smartplug_id))},
-                "manufacturer": MANUFACTURER,
-                "model": self._smartplug.model,
-                "sw_version": self._smartplug.firmware_version,
-                "via_device": (DOMAIN, self._data.wiserhub.system.name),
-            }
+        return self._data.get_device_info(self._smartplug_id)
 
     @callback
     async def async_set_mode(self, mode):
         _LOGGER.info(f"Setting {self._smartplug.name} to {mode} mode")
-        await self.hass.async_add_executor_job(
-            self.select_option, mode
-        )
-        await self.async_force_update()
+        await self.async_select_option(mode)
 
     @callback
     async def async_get_schedule(self, filename: str) -> None:
         try:
             if self._smartplug.schedule:
                 _LOGGER.info(f"Saving {self._smartplug.name} schedule to file {filename}")
-                await self.hass.async_add_executor_job(
-                    self._smartplug.schedule.save_schedule_to_yaml_file, filename
+                await self._data.async_hub_command(
+                    PRIORITY_SCHEDULE, "smartplug.schedule.save_to_file", self._smartplug.schedule.save_schedule_to_yaml_file, filename
                 )
             else:
                 _LOGGER.warning(f"{self._smartplug.name} has no schedule to save")
@@ -306,8 +299,8 @@ class WiserSmartPlugModeSelect(WiserSelectEntity):
         try:
             if self._smartplug.schedule:
                 _LOGGER.info(f"Setting {self._smartplug.name} schedule from file {filename}")
-                await self.hass.async_add_executor_job(
-                    self._smartplug.schedule.set_schedule_from_yaml_file, filename
+                await self._data.async_hub_command(
+                    PRIORITY_SCHEDULE, "smartplug.schedule.set_from_file", self._smartplug.schedule.set_schedule_from_yaml_file, filename
                 )
                 await self.async_force_update()
             else:
@@ -322,8 +315,8 @@ class WiserSmartPlugModeSelect(WiserSelectEntity):
             if self._smartplug.schedule:
                 # Add Check that to_entity is of same type as from_entity
                 _LOGGER.info(f"Copying schedule from {self._smartplug.name} to {to_smartplug_name}")
-                await self.hass.async_add_executor_job(
-                        self._smartplug.schedule.copy_schedule, self._data.wiserhub.devices.smartplugs.get_by_name(to_smartplug_name).schedule.id
+                await self._data.async_hub_command(
+                        PRIORITY_SCHEDULE, "smartplug.schedule.copy", self._smartplug.schedule.copy_schedule, self._data.wiserhub.devices.smartplugs.get_by_name(to_smartplug_name).schedule.id
                     )
                 await self.async_force_update()
             else:
@@ -5,30 +5,28 @@ https://github.com/asantaga/wiserHomeAssistantPlatform
 Angelosantagata@gmail.com
 
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
+import time
 from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass
 from homeassistant.const import ATTR_BATTERY_LEVEL, DEVICE_CLASS_BATTERY, DEVICE_CLASS_TEMPERATURE, TEMP_CELSIUS, DEVICE_CLASS_POWER_FACTOR, PERCENTAGE
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import Entity
-from homeassistant.helpers import config_validation as cv, entity_platform, service
-import voluptuous as vol
+from homeassistant.helpers.restore_state import ExtraStoredData, RestoreEntity
+from homeassistant.util import dt as dt_util
 
 from .const import (
     DATA,
     DOMAIN,
     MANUFACTURER,
+    RUNTIME_HISTORY_DAYS,
+    RUNTIME_MAX_SAMPLE_GAP,
     SIGNAL_STRENGTH_ICONS,
 )
-from .helpers import get_device_name, get_room_name, get_unique_id, get_identifier
+from .helpers import get_device_name, get_room_name, get_unique_id
 
 _LOGGER = logging.getLogger(__name__)
 
-CONF_HUB_ID = "wiser_hub_id"
-SERVICE_REMOVE_ORPHANED_ENTRIES = "remove_orphaned_entries"
-SELECT_HUB_SCHEMA = vol.All(vol.Schema({vol.Optional(CONF_HUB_ID): str}))
-
-
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Initialize the entry."""
@@ -48,11 +46,23 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
                 wiser_sensors.append(
                         WiserBatterySensor(data, device.id, sensor_type = "Battery")
                 )
+            if device.product_type == "SmartPlug":
+                wiser_sensors.append(
+                    WiserRepeaterSensor(data, device.id, sensor_type = "Repeater")
+                )
     
     # Add cloud status sensor
     _LOGGER.debug("Setting up Cloud sensor")
     wiser_sensors.append(WiserSystemCloudSensor(data, sensor_type = "Cloud"))
 
+    # Add hub job queue sensor
+    _LOGGER.debug("Setting up Hub Queue sensor")
+    wiser_sensors.append(WiserHubQueueSensor(data, sensor_type = "Hub Queue"))
+
+    # Add data freshness sensor
+    _LOGGER.debug("Setting up Last Hub Update sensor")
+    wiser_sensors.append(WiserHubFreshnessSensor(data, sensor_type = "Last Hub Update"))
+
     # Add operation sensor
     _LOGGER.debug("Setting up Heating Operation Mode sensor")
     wiser_sensors.append(
@@ -99,12 +109,29 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
                 WiserLTSDemandSensor(data, 0, "hotwater")
             )
 
+    # Add heating runtime sensors
+    if data.enable_runtime_sensors:
+        _LOGGER.debug("Setting up Heating Runtime sensors")
+        for room in data.wiserhub.rooms.all:
+            if len(room.devices) > 0:
+                wiser_sensors.append(WiserRuntimeSensor(data, room.id, "room"))
+
+        if data.wiserhub.heating_channels:
+            for channel in data.wiserhub.heating_channels.all:
+                wiser_sensors.append(WiserRuntimeSensor(data, channel.id, "heating"))
+
+        if data.wiserhub.hotwater:
+            wiser_sensors.append(WiserRuntimeSensor(data, 0, "hotwater"))
+
     async_add_entities(wiser_sensors, True)
 
 
 class WiserSensor(Entity):
     """Definition of a Wiser sensor."""
 
+    # Hot water sensors showing a boost countdown between hub updates
+    _boost_countdown = False
+
     def __init__(self, config_entry, device_id=0, sensor_type=""):
         """Initialize the sensor."""
         self._attr_device_class = SensorDeviceClass.POWER_FACTOR
@@ -130,6 +157,11 @@ class WiserSensor(Entity):
         """Return the polling state."""
         return False
 
+    @property
+    def available(self):
+        """Return if hub data is fresh enough to be trusted."""
+        return not self._data.is_stale
+
     @property
     def state(self):
         """Return the state of the sensor."""
@@ -144,28 +176,34 @@ class WiserSensor(Entity):
     @property
     def device_info(self):
         """Return device specific attributes."""
-        return {
-                "name": get_device_name(self._data, 0),
-                "identifiers": {(DOMAIN, get_identifier(self._data, 0))},
-                "manufacturer": MANUFACTURER,
-                "model": self._data.wiserhub.system.model,
-                "sw_version": self._data.wiserhub.system.firmware_version,
-                "via_device": (DOMAIN, self._data.wiserhub.system.name),
-            }
+        return self._data.get_device_info(0)
+
+    async def async_update_state(self):
+        """Update sensor state."""
+        await self.async_update_ha_state(True)
+        self._data.record_state_write("sensor")
 
     async def async_added_to_hass(self):
         """Subscribe for update from the hub."""
-
-        async def async_update_state():
-            """Update sensor state."""
-            await self.async_update_ha_state(True)
-
         self.async_on_remove(
             async_dispatcher_connect(
-                self.hass, f"{self._data.wiserhub.system.name}-HubUpdateMessage", async_update_state
+                self.hass, f"{self._data.wiserhub.system.name}-HubUpdateMessage", self.async_update_state
             )
         )
 
+        if self._boost_countdown:
+            async def async_update_boost_countdown():
+                """Update boost countdown from cached hub data."""
+                if self._data.wiserhub.hotwater.is_boosted:
+                    await self.async_update_ha_state(True)
+                    self._data.record_state_write("sensor")
+
+            self.async_on_remove(
+                async_dispatcher_connect(
+                    self.hass, f"{self._data.wiserhub.system.name}-BoostTickMessage", async_update_boost_countdown
+                )
+            )
+
 
 class WiserBatterySensor(WiserSensor):
     """Definition of a battery sensor for wiser iTRVs and RoomStats."""
@@ -211,14 +249,7 @@ class WiserBatterySensor(WiserSensor):
     @property
     def device_info(self):
         """Return device specific attributes."""
-        return {
-                "name": get_device_name(self._data, self._device_id),
-                "identifiers": {(DOMAIN, get_identifier(self._data, self._device_id))},
-                "manufacturer": MANUFACTURER,
-                "model": self._device.model,
-                "sw_version": self._device.firmware_version,
-                "via_device": (DOMAIN, self._data.wiserhub.system.name),
-            }
+        return self._data.get_device_info(self._device_id)
 
 
 class WiserDeviceSignalSensor(WiserSensor):
@@ -242,14 +273,7 @@ class WiserDeviceSignalSensor(WiserSensor):
     @property
     def device_info(self):
         """Return device specific attributes."""
-        return {
-                "name": get_device_name(self._data, self._device_id),
-                "identifiers": {(DOMAIN, get_identifier(self._data, self._device_id))},
-                "manufacturer": MANUFACTURER,
-                "model": self._device.model,
-                "sw_version": self._device.firmware_version,
-                "via_device": (DOMAIN, self._data.wiserhub.system.name),
-            }
+        return self._data.get_device_info(self._device_id)
 
     @property
     def icon(self):
@@ -266,7 +290,6 @@ class WiserDeviceSignalSensor(WiserSensor):
     def extra_state_attributes(self):
         """Return device state attributes."""
         attrs = {}
-        device_data = self._data.wiserhub.devices.get_by_id(self._device_id)
 
         # Generic attributes
         attrs["vendor"] = MANUFACTURER
@@ -293,7 +316,15 @@ class WiserDeviceSignalSensor(WiserSensor):
                 attrs["hub_route"] = "direct"
             else:
                 attrs["hub_route"] = "repeater"
-                attrs["repeater"] = self._data.wiserhub.devices.get_by_node_id(device_data.parent_node_id).name
+                parent = self._data.topology.get_parent(self._device_id)
+                attrs["repeater"] = parent["name"] if parent else None
+
+        node = self._data.topology.get_node(self._device_id)
+        if node:
+            attrs["hop_count"] = node["depth"]
+            if node["weakest_link"]:
+                attrs["weakest_link_node_id"] = node["weakest_link"]["node_id"]
+                attrs["weakest_link_RSSI"] = node["weakest_link"]["rssi"]
 
 
         if self._device.signal.device_reception_rssi is not None:
@@ -304,6 +335,8 @@ class WiserDeviceSignalSensor(WiserSensor):
             attrs["controller_reception_RSSI"] = self._device.signal.controller_reception_rssi
             attrs["device_reception_LQI"] = self._device.signal.controller_reception_lqi
 
+        attrs["data_last_changed"] = self._data.freshness.last_changed("Device", self._device_id)
+
         # Other
         if self._sensor_type == "RoomStat":
             attrs["humidity"] = self._data.wiserhub.devices.roomstats.get_by_id(self._device_id).current_humidity
@@ -311,8 +344,59 @@ class WiserDeviceSignalSensor(WiserSensor):
         return attrs
 
 
+class WiserRepeaterSensor(WiserSensor):
+    """Sensor for the number of devices routed via a repeater."""
+
+    def __init__(self, data, device_id=0, sensor_type=""):
+        """Initialise the repeater sensor."""
+        super().__init__(data, device_id, sensor_type)
+        self._device = self._data.wiserhub.devices.get_by_id(self._device_id)
+
+    async def async_update(self):
+        """Fetch new state data for the sensor."""
+        await super().async_update()
+        self._device = self._data.wiserhub.devices.get_by_id(self._device_id)
+        self._state = len(self._data.topology.get_children(self._device_id))
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return f"{get_device_name(self._data, self._device_id)} {self._sensor_type}"
+
+    @property
+    def icon(self):
+        """Return icon."""
+        return "mdi:access-point-network"
+
+    @property
+    def unit_of_measurement(self):
+        return "devices"
+
+    @property
+    def device_info(self):
+        """Return device specific attributes."""
+        return self._data.get_device_info(self._device_id)
+
+    @property
+    def extra_state_attributes(self):
+        """Return devices routed via this repeater."""
+        attrs = {}
+        children = self._data.topology.get_children(self._device_id)
+        attrs["routed_devices"] = [child["name"] for child in children]
+        rssi = [child["link_rssi"] for child in children if child["link_rssi"] is not None]
+        if rssi:
+            attrs["weakest_child_RSSI"] = min(rssi)
+        return attrs
+
+    @property
+    def entity_category(self):
+        return 'diagnostic'
+
+
 class WiserSystemHotWaterPreset(WiserSensor):
     """Hotwater preset sensor"""
+
+    _boost_countdown = True
     def __init__(self, data, device_id=0, sensor_type=""):
         """Initialise the CircuitState Sensor."""
         super().__init__(data, device_id, sensor_type)
@@ -344,6 +428,7 @@ class WiserSystemCircuitState(WiserSensor):
     def __init__(self, data, device_id=0, sensor_type=""):
         """Initialise the CircuitState Sensor."""
         super().__init__(data, device_id, sensor_type)
+        self._boost_countdown = sensor_type != "Heating"
 
     async def async_update(self):
         """Fetch new state data for the sensor."""
@@ -412,6 +497,99 @@ class WiserSystemCloudSensor(WiserSensor):
         return "mdi:cloud-alert"
 
 
+class WiserHubQueueSensor(WiserSensor):
+    """Sensor for the depth and wait times of the hub job queue."""
+
+    def __init__(self, data, device_id=0, sensor_type=""):
+        """Initialise the hub queue sensor."""
+        super().__init__(data, device_id, sensor_type)
+
+    async def async_update(self):
+        """Fetch new state data for the sensor."""
+        await super().async_update()
+        self._state = self._data.executor.queue_depth
+
+    @property
+    def available(self):
+        """Return True as the queue is independent of hub data freshness."""
+        return True
+
+    @property
+    def icon(self):
+        """Return icon."""
+        return "mdi:tray-full"
+
+    @property
+    def unit_of_measurement(self):
+        return "jobs"
+
+    @property
+    def extra_state_attributes(self):
+        """Return queue wait times by job type."""
+        attrs = {}
+        for job_type, stats in self._data.executor.wait_stats.items():
+            for stat, value in stats.items():
+                attrs[f"{job_type}_{stat}"] = value
+        attrs["offline_commands"] = self._data.command_queue.depth
+        return attrs
+
+    @property
+    def entity_category(self):
+        return 'diagnostic'
+
+
+class WiserHubFreshnessSensor(WiserSensor):
+    """Sensor for when hub data was last successfully updated."""
+
+    def __init__(self, data, device_id=0, sensor_type=""):
+        """Initialise the freshness sensor."""
+        super().__init__(data, device_id, sensor_type)
+
+    async def async_update(self):
+        """Fetch new state data for the sensor."""
+        await super().async_update()
+        last_refreshed = self._data.last_refreshed
+        self._state = last_refreshed.isoformat() if last_refreshed else None
+
+    async def async_added_to_hass(self):
+        """Subscribe for failed updates as well as updates from the hub."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, f"{self._data.wiserhub.system.name}-FreshnessMessage", self.async_update_state
+            )
+        )
+
+    @property
+    def available(self):
+        """Return True as this sensor reports staleness itself."""
+        return True
+
+    @property
+    def device_class(self):
+        """Return the class of the sensor."""
+        return SensorDeviceClass.TIMESTAMP
+
+    @property
+    def icon(self):
+        """Return icon."""
+        return "mdi:update"
+
+    @property
+    def extra_state_attributes(self):
+        """Return freshness of hub data."""
+        attrs = {}
+        attrs["last_attempted"] = self._data.last_attempted
+        attrs["consecutive_failures"] = self._data.consecutive_failures
+        attrs["stale"] = self._data.is_stale
+        attrs["stale_after"] = self._data.stale_after
+        return attrs
+
+    @property
+    def entity_category(self):
+        return 'diagnostic'
+
+
 class WiserSystemOperationModeSensor(WiserSensor):
     """Sensor for the Wiser Operation Mode (Away/Normal etc)."""
 
@@ -444,7 +622,54 @@ class WiserSystemOperationModeSensor(WiserSensor):
         return attrs
 
 
-class WiserLTSTempSensor(WiserSensor):
+class WiserLTSSensor(WiserSensor):
+    """Base sensor for long term stats, only writing meaningful changes"""
+
+    def __init__(self, data, device_id=0, sensor_type=""):
+        """Initialise the LTS sensor."""
+        super().__init__(data, device_id, sensor_type)
+        self._written_state = None
+        self._written_at = None
+        self._written_available = None
+
+    @property
+    def deadband(self):
+        """Return change in value below which a new state is not written."""
+        return 0
+
+    def _should_write(self) -> bool:
+        """Return if the current value should be written to the state machine."""
+        if self._written_at is None or self.available != self._written_available:
+            return True
+        elapsed = time.monotonic() - self._written_at
+        if self._data.lts_max_interval and elapsed >= self._data.lts_max_interval:
+            return True
+        if self._state == self._written_state or elapsed < self._data.lts_min_interval:
+            return False
+        if self._state is None or self._written_state is None:
+            return True
+        return round(abs(self._state - self._written_state), 2) >= self.deadband
+
+    async def async_update_state(self):
+        """Update sensor state if changed by at least the deadband."""
+        await self.async_update()
+        written = self._should_write()
+        if written:
+            self._written_state = self._state
+            self._written_at = time.monotonic()
+            self._written_available = self.available
+            self.async_write_ha_state()
+        self._data.record_state_write("sensor", written)
+
+    @property
+    def state(self):
+        """Return the last written state of the sensor."""
+        if self._written_at is None:
+            return self._state
+        return self._written_state
+
+
+class WiserLTSTempSensor(WiserLTSSensor):
     """Sensor for long term stats for room temp and target temp"""
 
     def __init__(self, data, id, sensor_type=""):
@@ -466,13 +691,17 @@ class WiserLTSTempSensor(WiserSensor):
     @property
     def device_info(self):
         """Return device specific attributes."""
-        return {
-                "name": get_device_name(self._data, self._device_id,"room"),
-                "identifiers": {(DOMAIN, get_identifier(self._data, self._device_id,"room"))},
-                "manufacturer": MANUFACTURER,
-                "model": "Room",
-                "via_device": (DOMAIN, self._data.wiserhub.system.name),
-            }
+        return self._data.get_device_info(self._device_id, "room")
+
+    @property
+    def unique_id(self):
+        """Return unique Id."""
+        return get_unique_id(self._data, "sensor", f"lts_{self._lts_sensor_type}", self._device_id)
+
+    @property
+    def deadband(self):
+        """Return temperature deadband."""
+        return self._data.lts_temp_deadband
 
     @property
     def icon(self):
@@ -500,7 +729,7 @@ class WiserLTSTempSensor(WiserSensor):
         return 'diagnostic'
 
 
-class WiserLTSDemandSensor(WiserSensor):
+class WiserLTSDemandSensor(WiserLTSSensor):
     """Sensor for long term stats for room temp and target temp"""
 
     def __init__(self, data, id, sensor_type=""):
@@ -531,13 +760,19 @@ class WiserLTSDemandSensor(WiserSensor):
         if self._lts_sensor_type in ["heating", "hotwater"]:
             return super().device_info
         else:
-            return {
-                    "name": get_device_name(self._data, self._device_id,"room"),
-                    "identifiers": {(DOMAIN, get_identifier(self._data, self._device_id,"room"))},
-                    "manufacturer": MANUFACTURER,
-                    "model": "Room",
-                    "via_device": (DOMAIN, self._data.wiserhub.system.name),
-                }
+            return self._data.get_device_info(self._device_id, "room")
+
+    @property
+    def unique_id(self):
+        """Return unique Id."""
+        if self._lts_sensor_type in ["heating", "hotwater"]:
+            return super().unique_id
+        return get_unique_id(self._data, "sensor", "lts_room_demand", self._device_id)
+
+    @property
+    def deadband(self):
+        """Return demand deadband."""
+        return self._data.lts_demand_deadband
 
     @property
     def icon(self):
@@ -561,3 +796,141 @@ class WiserLTSDemandSensor(WiserSensor):
     @property
     def entity_category(self):
         return 'diagnostic'
+
+
+class WiserRuntimeAccumulator:
+    """Daily heating runtime built up incrementally from successive hub samples"""
+
+    def __init__(self, daily_runtime=None):
+        """Initialise the accumulator with any restored daily totals."""
+        self._daily_runtime = dict(daily_runtime or {})
+        self._last_sample = None
+
+    @property
+    def daily_runtime(self) -> dict:
+        """Return seconds of runtime keyed by local iso date."""
+        return self._daily_runtime
+
+    def add_sample(self, when: datetime, heating: bool):
+        """Add runtime since the last sample if it was heating."""
+        if self._last_sample is not None:
+            last_when, last_heating = self._last_sample
+            if last_heating and when > last_when:
+                # Don't count long gaps where the hub could not be read
+                end = min(when, last_when + timedelta(seconds=RUNTIME_MAX_SAMPLE_GAP))
+                self._add_runtime(last_when, end)
+        self._last_sample = (when, heating)
+
+        oldest = (dt_util.as_local(when).date() - timedelta(days=RUNTIME_HISTORY_DAYS)).isoformat()
+        for day in [day for day in self._daily_runtime if day < oldest]:
+            del self._daily_runtime[day]
+
+    def _add_runtime(self, start: datetime, end: datetime):
+        """Add runtime between start and end, split at local midnight."""
+        start = dt_util.as_local(start)
+        end = dt_util.as_local(end)
+        while start < end:
+            next_day = dt_util.start_of_local_day(start.date() + timedelta(days=1))
+            period_end = min(end, next_day)
+            day = start.date().isoformat()
+            self._daily_runtime[day] = self._daily_runtime.get(day, 0) + (period_end - start).total_seconds()
+            start = period_end
+
+    def runtime(self, first_day, last_day) -> float:
+        """Return hours of runtime between two local dates inclusive."""
+        seconds = sum(
+            runtime
+            for day, runtime in self._daily_runtime.items()
+            if first_day.isoformat() <= day <= last_day.isoformat()
+        )
+        return round(seconds / 3600, 2)
+
+
+class WiserRuntimeExtraStoredData(ExtraStoredData):
+    """Daily runtime totals stored across restarts"""
+
+    def __init__(self, daily_runtime: dict):
+        self.daily_runtime = daily_runtime
+
+    def as_dict(self) -> dict:
+        return {"daily_runtime": self.daily_runtime}
+
+
+class WiserRuntimeSensor(WiserSensor, RestoreEntity):
+    """Sensor for heating runtime of a room, heating channel or hot water"""
+
+    def __init__(self, data, id, runtime_type="room"):
+        """Initialise the runtime sensor."""
+        self._runtime_type = runtime_type
+        self._accumulator = WiserRuntimeAccumulator()
+        super().__init__(data, id, f"Runtime {runtime_type}")
+
+    def _is_heating(self) -> bool:
+        """Return if the room, channel or hot water is currently heating."""
+        if self._runtime_type == "heating":
+            return self._data.wiserhub.heating_channels.get_by_id(self._device_id).heating_relay_status == "On"
+        if self._runtime_type == "hotwater":
+            return self._data.wiserhub.hotwater.is_heating
+        return self._data.wiserhub.rooms.get_by_id(self._device_id).is_heating
+
+    async def async_update(self):
+        """Fetch new state data for the sensor."""
+        await super().async_update()
+        self._accumulator.add_sample(dt_util.utcnow(), self._is_heating())
+        today = dt_util.now().date()
+        self._state = self._accumulator.runtime(today, today)
+
+    async def async_added_to_hass(self):
+        """Restore daily runtime and subscribe for update from the hub."""
+        extra_data = await self.async_get_last_extra_data()
+        if extra_data is not None:
+            self._accumulator = WiserRuntimeAccumulator(
+                extra_data.as_dict().get("daily_runtime")
+            )
+        await super().async_added_to_hass()
+
+    @property
+    def extra_restore_state_data(self) -> WiserRuntimeExtraStoredData:
+        """Return daily runtime to store across restarts."""
+        return WiserRuntimeExtraStoredData(self._accumulator.daily_runtime)
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        if self._runtime_type == "heating":
+            return f"{get_device_name(self._data, 0, 'Heating Runtime Channel')} {self._device_id}"
+        if self._runtime_type == "hotwater":
+            return get_device_name(self._data, 0, "Hot Water Runtime")
+        return f"{get_room_name(self._data, self._device_id)} Heating Runtime"
+
+    @property
+    def device_info(self):
+        """Return device specific attributes."""
+        if self._runtime_type in ["heating", "hotwater"]:
+            return super().device_info
+        return self._data.get_device_info(self._device_id, "room")
+
+    @property
+    def icon(self):
+        """Return icon for sensor"""
+        if self._runtime_type == "hotwater":
+            return "mdi:water-boiler"
+        return "mdi:radiator"
+
+    @property
+    def state_class(self):
+        return SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def unit_of_measurement(self):
+        return "h"
+
+    @property
+    def extra_state_attributes(self):
+        """Return runtime for previous periods."""
+        today = dt_util.now().date()
+        return {
+            "yesterday": self._accumulator.runtime(today - timedelta(days=1), today - timedelta(days=1)),
+            "this_week": self._accumulator.runtime(today - timedelta(days=today.weekday()), today),
+            "last_30_days": self._accumulator.runtime(today - timedelta(days=29), today),
+        }
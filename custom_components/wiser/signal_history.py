@@ -0,0 +1,107 @@
+"""
+Zigbee signal history for Wiser devices.
+
+https://github.com/asantaga/wiserHomeAssistantPlatform
+msparker@sky.com
+"""
+from array import array
+import math
+import time
+
+from .const import (
+    SIGNAL_HISTORY_DURATION,
+    SIGNAL_HISTORY_PERCENTILES,
+    SIGNAL_HISTORY_SAMPLE_INTERVAL,
+)
+
+SIGNAL_SERIES = {
+    "device_reception_rssi": lambda signal: signal.device_reception_rssi,
+    "device_reception_lqi": lambda signal: signal.device_reception_lqi,
+    "controller_reception_rssi": lambda signal: signal.controller_reception_rssi,
+    "controller_reception_lqi": lambda signal: signal.controller_reception_lqi,
+}
+
+
+class WiserRingBuffer:
+    """Fixed size, array backed buffer of timestamped integer samples."""
+
+    def __init__(self, capacity: int):
+        """Initialise the buffer with all storage allocated up front."""
+        self._values = array("h", bytes(2 * capacity))
+        self._times = array("d", bytes(8 * capacity))
+        self._capacity = capacity
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value: int, timestamp: float):
+        """Add a sample, overwriting the oldest when full."""
+        self._values[self._next] = value
+        self._times[self._next] = timestamp
+        self._next = (self._next + 1) % self._capacity
+        self._count = min(self._count + 1, self._capacity)
+
+    def statistics(self, since: float) -> dict:
+        """Return min, max, mean and percentiles of the samples taken since a time."""
+        values = sorted(
+            value
+            for value, timestamp in zip(self._values[: self._count], self._times[: self._count])
+            if timestamp >= since
+        )
+        if not values:
+            return {}
+        stats = {
+            "min": values[0],
+            "max": values[-1],
+            "mean": round(sum(values) / len(values), 1),
+        }
+        for percentile in SIGNAL_HISTORY_PERCENTILES:
+            stats[f"p{percentile}"] = values[round(percentile / 100 * (len(values) - 1))]
+        stats["samples"] = len(values)
+        return stats
+
+
+class WiserSignalHistory:
+    """Per device ring buffers of zigbee rssi and lqi samples."""
+
+    def __init__(self):
+        """Size buffers to hold the history duration at one sample per interval."""
+        self._capacity = math.ceil(SIGNAL_HISTORY_DURATION / SIGNAL_HISTORY_SAMPLE_INTERVAL)
+        self._devices = {}
+        self._last_sample = None
+
+    def add_samples(self, devices):
+        """Add the current signal readings of each device, at most once per sample interval.
+
+        Hub reads are more frequent than the scan interval when forced by commands, so
+        samples are spaced by time rather than taken on every read.
+        """
+        now = time.monotonic()
+        if self._last_sample is not None and now - self._last_sample < SIGNAL_HISTORY_SAMPLE_INTERVAL:
+            return
+        self._last_sample = now
+        for device in devices:
+            buffers = self._devices.get(device.id)
+            if buffers is None:
+                buffers = self._devices[device.id] = {}
+            for series, reading in SIGNAL_SERIES.items():
+                value = reading(device.signal)
+                if value is None:
+                    continue
+                if series not in buffers:
+                    buffers[series] = WiserRingBuffer(self._capacity)
+                buffers[series].append(value, now)
+
+    def statistics(self, device_id: int) -> dict:
+        """Return statistics for each signal series of a device over the history duration."""
+        since = time.monotonic() - SIGNAL_HISTORY_DURATION
+        return {
+            series: buffer.statistics(since)
+            for series, buffer in self._devices.get(device_id, {}).items()
+        }
+
+    def as_dict(self) -> dict:
+        """Return statistics for all devices."""
+        return {device_id: self.statistics(device_id) for device_id in self._devices}
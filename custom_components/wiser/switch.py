@@ -6,28 +6,26 @@ Angelosantagata@gmail.com
 """
 import asyncio
 import logging
-import voluptuous as vol
+import time
 
 from homeassistant.components.switch import SwitchEntity
-from homeassistant.const import ATTR_ENTITY_ID
-from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .const import DATA, DOMAIN, MANUFACTURER
-from .helpers import get_device_name, get_identifier, get_room_name, get_unique_id
+from .const import (
+    DATA,
+    DOMAIN,
+    PRIORITY_POLL,
+    SMARTPLUG_CONFIRM_DELAY,
+    SMARTPLUG_CONFIRM_TIMEOUT,
+)
+from .command_queue import COMMAND_QUEUED
+from .helpers import WiserPendingState, get_device_name, get_room_name, get_unique_id
 
 _LOGGER = logging.getLogger(__name__)
 
 ATTR_PLUG_MODE = "plug_mode"
 ATTR_HOTWATER_MODE = "hotwater_mode"
 
-SET_PLUG_MODE_SCHEMA = vol.Schema(
-    {
-        vol.Required(ATTR_ENTITY_ID): cv.entity_id,
-        vol.Required(ATTR_PLUG_MODE, default="Auto"): vol.Coerce(str),
-    }
-)
-
 WISER_SWITCHES = [
     {
         "name": "Valve Protection",
@@ -133,11 +131,17 @@ class WiserSwitch(SwitchEntity):
         self._is_on = False
         self._type = type
         self._away_temperature = None
+        self._pending = WiserPendingState(self)
         _LOGGER.info(f"{self._data.wiserhub.system.name} {self.name} init")
 
     async def async_force_update(self):
         await self._data.async_update(no_throttle=True)
 
+    @property
+    def available(self):
+        """Return if hub data is fresh enough to be trusted."""
+        return not self._data.is_stale
+
     @property
     def name(self):
         """Return the name of the Device."""
@@ -162,7 +166,7 @@ class WiserSwitch(SwitchEntity):
     def is_on(self):
         """Return true if device is on."""
         _LOGGER.debug("%s: %s", self._name, self._is_on)
-        return self._is_on
+        return self._pending.get("is_on", self._is_on)
 
     async def async_turn_on(self, **kwargs):
         """Turn the device on."""
@@ -179,6 +183,7 @@ class WiserSwitch(SwitchEntity):
         async def async_update_state():
             """Update sensor state."""
             await self.async_update_ha_state(True)
+            self._data.record_state_write("switch")
 
         self.async_on_remove(
             async_dispatcher_connect(
@@ -199,36 +204,32 @@ class WiserSystemSwitch(WiserSwitch):
         """Async Update to HA."""
         _LOGGER.debug("Wiser %s Switch Update requested", self._name)
         self._is_on = getattr(self._data.wiserhub.system, self._key)
+        self._pending.reconcile("is_on", self._is_on)
         if self._name == "Away Mode":
             self._away_temperature = self._data.wiserhub.system.away_mode_target_temperature
 
     async def async_turn_on(self, **kwargs):
         """Turn the device on."""
-        await self.hass.async_add_executor_job(
-            setattr, self._data.wiserhub.system, self._key, True
+        result = await self._pending.async_apply(
+            "is_on", True, f"system.{self._key}", setattr, self._data.wiserhub.system, self._key, True
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
         return True
 
     async def async_turn_off(self, **kwargs):
         """Turn the device off."""
-        await self.hass.async_add_executor_job(
-            setattr, self._data.wiserhub.system, self._key, False
+        result = await self._pending.async_apply(
+            "is_on", False, f"system.{self._key}", setattr, self._data.wiserhub.system, self._key, False
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
         return True
 
     @property
     def device_info(self):
         """Return device specific attributes."""
-        return {
-                "name": get_device_name(self._data, 0),
-                "identifiers": {(DOMAIN, get_identifier(self._data, 0))},
-                "manufacturer": MANUFACTURER,
-                "model": self._data.wiserhub.system.model,
-                "sw_version": self._data.wiserhub.system.firmware_version,
-                "via_device": (DOMAIN, self._data.wiserhub.system.name),
-            }
+        return self._data.get_device_info(0)
 
     @property
     def extra_state_attributes(self):
@@ -255,38 +256,40 @@ class WiserRoomSwitch(WiserSwitch):
         _LOGGER.debug("Wiser %s Switch Update requested", self._name)
         self._room = self._data.wiserhub.rooms.get_by_id(self._room_id)
         self._is_on = getattr(self._room, self._key)
+        self._pending.reconcile("is_on", self._is_on)
 
     @property
     def name(self):
         """Return the name of the Device."""
         return f"{get_room_name(self._data, self._room_id)} {self._name}"
 
+    @property
+    def unique_id(self):
+        """Return unique Id."""
+        return get_unique_id(self._data, self._type, self._name, self._room_id)
+
     async def async_turn_on(self, **kwargs):
         """Turn the device on."""
-        await self.hass.async_add_executor_job(
-            setattr, self._room, self._key, True
+        result = await self._pending.async_apply(
+            "is_on", True, f"room.{self._key}", setattr, self._room, self._key, True
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
         return True
 
     async def async_turn_off(self, **kwargs):
         """Turn the device off."""
-        await self.hass.async_add_executor_job(
-            setattr, self._room, self._key, False
+        result = await self._pending.async_apply(
+            "is_on", False, f"room.{self._key}", setattr, self._room, self._key, False
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
         return True
 
     @property
     def device_info(self):
         """Return device specific attributes."""
-        return {
-                "name": get_device_name(self._data, self._room_id,"room"),
-                "identifiers": {(DOMAIN, get_identifier(self._data, self._room_id,"room"))},
-                "manufacturer": MANUFACTURER,
-                "model": "Room",
-                "via_device": (DOMAIN, self._data.wiserhub.system.name),
-            }
+        return self._data.get_device_info(self._room_id, "room")
 
     @property
     def extra_state_attributes(self):
@@ -309,6 +312,7 @@ class WiserDeviceSwitch(WiserSwitch):
         _LOGGER.debug("Wiser %s Switch Update requested", self._name)
         self._device = self._data.wiserhub.devices.get_by_id(self._device_id)
         self._is_on = getattr(self._device, self._key)
+        self._pending.reconcile("is_on", self._is_on)
 
     @property
     def name(self):
@@ -317,18 +321,20 @@ class WiserDeviceSwitch(WiserSwitch):
 
     async def async_turn_on(self, **kwargs):
         """Turn the device on."""
-        await self.hass.async_add_executor_job(
-            setattr, self._device, self._key, True
+        result = await self._pending.async_apply(
+            "is_on", True, f"device.{self._key}", setattr, self._device, self._key, True
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
         return True
 
     async def async_turn_off(self, **kwargs):
         """Turn the device off."""
-        await self.hass.async_add_executor_job(
-            setattr, self._device, self._key, False
+        result = await self._pending.async_apply(
+            "is_on", False, f"device.{self._key}", setattr, self._device, self._key, False
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_force_update()
         return True
 
     @property
@@ -344,14 +350,7 @@ class WiserDeviceSwitch(WiserSwitch):
     @property
     def device_info(self):
         """Return device specific attributes."""
-        return {
-                "name": get_device_name(self._data, self._device_id),
-                "identifiers": {(DOMAIN, get_identifier(self._data, self._device_id))},
-                "manufacturer": MANUFACTURER,
-                "model": self._device.model,
-                "sw_version": self._device.firmware_version,
-                "via_device": (DOMAIN, self._data.wiserhub.system.name),
-            }
+        return self._data.get_device_info(self._device_id)
 
     @property
     def extra_state_attributes(self):
@@ -369,16 +368,45 @@ class WiserSmartPlug(WiserSwitch):
         self._smart_plug_id = plugId
         super().__init__(data, name, "", "smartplug", "mdi:power-socket-uk")
         self._smartplug = self._data.wiserhub.devices.get_by_id(self._smart_plug_id)
-
-    async def async_force_update(self):
-        await asyncio.sleep(1)
-        await self._data.async_update(no_throttle=True)
+        self._confirming = False
+        self._actuation_latency = None
+
+    async def async_confirm_state(self, is_on: bool):
+        """Read the plug at growing intervals until it reports the commanded state."""
+        self._confirming = True
+        started = time.monotonic()
+        delay = SMARTPLUG_CONFIRM_DELAY
+        confirmed = False
+        try:
+            while not confirmed and time.monotonic() - started < SMARTPLUG_CONFIRM_TIMEOUT:
+                await asyncio.sleep(delay)
+                delay *= 2
+                try:
+                    smartplug = await self._data.async_add_hub_job(
+                        PRIORITY_POLL, self._data.wiserhub.read_smartplug, self._smart_plug_id
+                    )
+                except Exception as ex:  # pylint: disable=broad-except
+                    _LOGGER.debug(f"Unable to read {self.name} state. Error is {ex}")
+                    continue
+                confirmed = smartplug is not None and smartplug.is_on == is_on
+        finally:
+            self._confirming = False
+
+        if confirmed:
+            self._actuation_latency = round(time.monotonic() - started, 2)
+            _LOGGER.debug(f"{self.name} confirmed {'on' if is_on else 'off'} after {self._actuation_latency}s")
+        else:
+            _LOGGER.warning(f"{self.name} did not report {'on' if is_on else 'off'} within {SMARTPLUG_CONFIRM_TIMEOUT}s")
+        self._data.async_dispatch_update()
 
     async def async_update(self):
         """Async Update to HA."""
         _LOGGER.debug("Wiser %s Switch Update requested", self._name)
         self._smartplug = self._data.wiserhub.devices.get_by_id(self._smart_plug_id)
         self._is_on = self._smartplug.is_on
+        # Plug may not have actuated yet whilst confirming the command
+        if not self._confirming:
+            self._pending.reconcile("is_on", self._is_on)
 
     @property
     def name(self):
@@ -388,24 +416,12 @@ class WiserSmartPlug(WiserSwitch):
     @property
     def unique_id(self):
         """Return unique Id."""
-        return get_unique_id(
-            self._data, 
-            self._smartplug.product_type, 
-            self._name,
-            self._smart_plug_id
-        )
+        return get_unique_id(self._data, self._smartplug.product_type, "switch", self._smart_plug_id)
 
     @property
     def device_info(self):
         """Return device specific attributes."""
-        return {
-                "name": get_device_name(self._data, self._smart_plug_id),
-                "identifiers": {(DOMAIN, get_identifier(self._data, self._smart_plug_id))},
-                "manufacturer": MANUFACTURER,
-                "model": self._smartplug.model,
-                "sw_version": self._smartplug.firmware_version,
-                "via_device": (DOMAIN, self._data.wiserhub.system.name),
-            }
+        return self._data.get_device_info(self._smart_plug_id)
 
     @property
     def extra_state_attributes(self):
@@ -418,6 +434,7 @@ class WiserSmartPlug(WiserSwitch):
         attrs["output_state"] = "On" if self._smartplug.is_on else "Off"
         attrs["control_source"] = self._smartplug.control_source
         attrs["scheduled_state"] = self._smartplug.scheduled_state
+        attrs["actuation_latency"] = self._actuation_latency
         if self._smartplug.schedule:
             attrs["next_schedule_change"] = str(self._smartplug.schedule.next.time)
             attrs["next_schedule_state"] = self._smartplug.schedule.next.setting
@@ -425,16 +442,18 @@ class WiserSmartPlug(WiserSwitch):
 
     async def async_turn_on(self, **kwargs):
         """Turn the device on."""
-        await self.hass.async_add_executor_job(
-            self._smartplug.turn_on
+        result = await self._pending.async_apply(
+            "is_on", True, "smartplug.turn_on", self._smartplug.turn_on
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_confirm_state(True)
         return True
 
     async def async_turn_off(self, **kwargs):
         """Turn the device off."""
-        await self.hass.async_add_executor_job(
-            self._smartplug.turn_off
+        result = await self._pending.async_apply(
+            "is_on", False, "smartplug.turn_off", self._smartplug.turn_off
         )
-        await self.async_force_update()
+        if result is not COMMAND_QUEUED:
+            await self.async_confirm_state(False)
         return True
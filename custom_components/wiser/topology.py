@@ -0,0 +1,114 @@
+"""
+Zigbee mesh topology for Wiser devices.
+
+https://github.com/asantaga/wiserHomeAssistantPlatform
+msparker@sky.com
+"""
+HUB_NODE_ID = 0
+
+
+class WiserTopology:
+    """Index of the zigbee mesh built once from a hub snapshot."""
+
+    def __init__(self, devices=None):
+        """Build node, parent and child index from the hub devices."""
+        self._nodes = {
+            HUB_NODE_ID: {
+                "device_id": 0,
+                "name": "Hub",
+                "product_type": "Controller",
+                "parent_node_id": None,
+                "link_rssi": None,
+                "children": [],
+                "depth": 0,
+                "weakest_link": None,
+            }
+        }
+        self._device_nodes = {}
+
+        for device in devices or []:
+            self._nodes[device.node_id] = {
+                "device_id": device.id,
+                "name": device.name,
+                "product_type": device.product_type,
+                "parent_node_id": device.parent_node_id,
+                "link_rssi": self._link_rssi(device.signal),
+                "children": [],
+            }
+            self._device_nodes[device.id] = device.node_id
+
+        for node_id, node in self._nodes.items():
+            parent = self._nodes.get(node["parent_node_id"])
+            if parent is not None and node_id != HUB_NODE_ID:
+                parent["children"].append(node_id)
+
+        for node_id in self._nodes:
+            self._resolve_path(node_id)
+
+    @staticmethod
+    def _link_rssi(signal):
+        """Return weaker direction of the link between a device and its parent."""
+        readings = [
+            rssi
+            for rssi in [signal.device_reception_rssi, signal.controller_reception_rssi]
+            if rssi is not None
+        ]
+        return min(readings) if readings else None
+
+    def _resolve_path(self, node_id):
+        """Set hop depth and weakest link on the path from a node to the hub."""
+        path = []
+        visited = set()
+        current = node_id
+        # Walk up until a resolved node, the hub or an unknown or looping parent
+        while current in self._nodes and "depth" not in self._nodes[current]:
+            if current in visited:
+                break
+            visited.add(current)
+            path.append(current)
+            current = self._nodes[current]["parent_node_id"]
+
+        resolved = self._nodes.get(current)
+        depth = resolved["depth"] if resolved and "depth" in resolved else None
+        weakest = resolved["weakest_link"] if resolved and "depth" in resolved else None
+
+        for path_node_id in reversed(path):
+            node = self._nodes[path_node_id]
+            if depth is not None:
+                depth += 1
+                if node["link_rssi"] is not None and (
+                    weakest is None or node["link_rssi"] < weakest["rssi"]
+                ):
+                    weakest = {"node_id": path_node_id, "rssi": node["link_rssi"]}
+            node["depth"] = depth
+            node["weakest_link"] = weakest if depth is not None else None
+
+    def get_node(self, device_id: int) -> dict:
+        """Return topology node for a device id."""
+        return self._nodes.get(self._device_nodes.get(device_id))
+
+    def get_parent(self, device_id: int) -> dict:
+        """Return parent node for a device id."""
+        node = self.get_node(device_id)
+        return self._nodes.get(node["parent_node_id"]) if node else None
+
+    def get_children(self, device_id: int) -> list:
+        """Return child nodes routed via a device id."""
+        node = self.get_node(device_id)
+        return [self._nodes[child] for child in node["children"]] if node else []
+
+    @property
+    def repeaters(self) -> dict:
+        """Return child counts of all nodes routing other devices."""
+        return {
+            node["name"]: len(node["children"])
+            for node in self._nodes.values()
+            if node["children"]
+        }
+
+    def as_dict(self) -> dict:
+        """Return topology as a serialisable dict."""
+        return {
+            "nodes": {node_id: dict(node) for node_id, node in self._nodes.items()},
+            "repeaters": self.repeaters,
+        }
@@ -0,0 +1,114 @@
+"""
+Hub response trace recorder for Wiser System.
+
+https://github.com/asantaga/wiserHomeAssistantPlatform
+msparker@sky.com
+"""
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+
+from homeassistant.util import dt as dt_util
+
+from .const import TRACE_BACKUP_COUNT, TRACE_MAX_BYTES
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WiserTraceRecorder:
+    """Append hub responses and commands to a rotating gzip jsonl file."""
+
+    def __init__(self, path: str, max_bytes: int = TRACE_MAX_BYTES, backup_count: int = TRACE_BACKUP_COUNT):
+        """Initialise the recorder and start its writer thread."""
+        self._path = path
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._writer, name=f"wiser-trace-{os.path.basename(path)}", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def path(self) -> str:
+        """Return path of the current trace file."""
+        return self._path
+
+    def record_poll(self, data: dict, latency: float, endpoint_timings: dict = None):
+        """Queue the raw payloads of a hub read."""
+        self._queue.put({
+            "time": dt_util.utcnow().isoformat(),
+            "type": "poll",
+            "latency": round(latency, 3),
+            "endpoints": {endpoint: round(duration, 3) for endpoint, duration in (endpoint_timings or {}).items()},
+            "data": data,
+        })
+
+    def record_poll_error(self, ex: Exception, latency: float):
+        """Queue a failed hub read."""
+        self._queue.put({
+            "time": dt_util.utcnow().isoformat(),
+            "type": "poll_error",
+            "latency": round(latency, 3),
+            "error": f"{type(ex).__name__}: {ex}",
+        })
+
+    def record_command(self, command: str, args: tuple, latency: float, ex: Exception = None):
+        """Queue an issued hub command."""
+        self._queue.put({
+            "time": dt_util.utcnow().isoformat(),
+            "type": "command",
+            "command": command,
+            "args": list(args),
+            "latency": round(latency, 3),
+            "error": f"{type(ex).__name__}: {ex}" if ex else None,
+        })
+
+    def stop(self):
+        """Stop the writer once queued records are written."""
+        self._queue.put(None)
+
+    def _writer(self):
+        """Write queued records, rotating the file when it exceeds the size cap."""
+        file = None
+        try:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                try:
+                    line = json.dumps(record, default=str)
+                except (TypeError, ValueError, RuntimeError) as ex:
+                    _LOGGER.debug(f"Unable to serialise trace record: {ex}")
+                    continue
+
+                if file is None:
+                    file = gzip.open(self._path, "at", encoding="utf-8")
+                file.write(line + "\n")
+
+                # Flush once the queue is drained so records survive a restart
+                if self._queue.empty():
+                    file.flush()
+                    if os.path.getsize(self._path) >= self._max_bytes:
+                        file.close()
+                        file = None
+                        self._rotate()
+        except OSError as ex:
+            _LOGGER.error(f"Wiser trace recorder stopped writing to {self._path}: {ex}")
+        finally:
+            if file is not None:
+                file.close()
+
+    def _rotate(self):
+        """Rotate trace files, keeping backup_count old files."""
+        for index in range(self._backup_count - 1, 0, -1):
+            source = f"{self._path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self._path}.{index + 1}")
+        if self._backup_count:
+            os.replace(self._path, f"{self._path}.1")
+        else:
+            os.remove(self._path)
@@ -0,0 +1,146 @@
+"""
+Websocket commands for Wiser System.
+
+https://github.com/asantaga/wiserHomeAssistantPlatform
+msparker@sky.com
+"""
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import CONF_HUB_ID, DATA, DOMAIN
+
+# Room snapshot columns and the room property each is read from
+ROOM_COLUMNS = {
+    "name": "name",
+    "current_temperature": "current_temperature",
+    "target_temperature": "current_target_temperature",
+    "percentage_demand": "percentage_demand",
+    "is_heating": "is_heating",
+    "is_boosted": "is_boosted",
+    "mode": "mode",
+}
+
+
+@callback
+def async_register_websocket_commands(hass):
+    """Register websocket commands."""
+    websocket_api.async_register_command(hass, websocket_get_rooms)
+    websocket_api.async_register_command(hass, websocket_subscribe_rooms)
+    websocket_api.async_register_command(hass, websocket_get_signal_history)
+
+
+def _get_handles(hass, hub_id: str = None) -> dict:
+    """Return handles of connected hubs by hub name, or only the named hub."""
+    handles = {}
+    for entry in hass.data.get(DOMAIN, {}).values():
+        handle = entry.get(DATA)
+        if handle and handle.wiserhub and hub_id in (None, handle.wiserhub.system.name):
+            handles[handle.wiserhub.system.name] = handle
+    return handles
+
+
+def get_room_rows(handle) -> dict:
+    """Return column values of each room by room id."""
+    if not handle.wiserhub.rooms:
+        return {}
+    return {
+        room.id: [getattr(room, attr) for attr in ROOM_COLUMNS.values()]
+        for room in handle.wiserhub.rooms.all
+    }
+
+
+def get_room_columns(rows: dict) -> dict:
+    """Return room rows as an id column plus one column per room value."""
+    columns = {"id": list(rows)}
+    for index, column in enumerate(ROOM_COLUMNS):
+        columns[column] = [row[index] for row in rows.values()]
+    return columns
+
+
+@websocket_api.websocket_command(
+    {vol.Required("type"): "wiser/rooms", vol.Optional(CONF_HUB_ID): str}
+)
+@callback
+def websocket_get_rooms(hass, connection, msg):
+    """Return a columnar snapshot of all rooms of each hub."""
+    connection.send_result(
+        msg["id"],
+        {
+            hub: get_room_columns(get_room_rows(handle))
+            for hub, handle in _get_handles(hass, msg.get(CONF_HUB_ID)).items()
+        },
+    )
+
+
+@websocket_api.websocket_command(
+    {vol.Required("type"): "wiser/rooms/subscribe", vol.Optional(CONF_HUB_ID): str}
+)
+@callback
+def websocket_subscribe_rooms(hass, connection, msg):
+    """Send a room snapshot, then only the rooms changed by each hub update."""
+    handles = _get_handles(hass, msg.get(CONF_HUB_ID))
+    last_rows = {hub: get_room_rows(handle) for hub, handle in handles.items()}
+    unsubscribes = []
+
+    def async_send_changes(hub):
+        @callback
+        def async_hub_updated():
+            # Look up the handle each time as reloading the entry replaces it
+            handle = _get_handles(hass, hub).get(hub)
+            if handle is None:
+                return
+            rows = get_room_rows(handle)
+            changed = {
+                room_id: row for room_id, row in rows.items() if last_rows[hub].get(room_id) != row
+            }
+            removed = [room_id for room_id in last_rows[hub] if room_id not in rows]
+            last_rows[hub] = rows
+            if changed or removed:
+                connection.send_message(
+                    websocket_api.event_message(
+                        msg["id"],
+                        {hub: {"changed": get_room_columns(changed), "removed": removed}},
+                    )
+                )
+
+        return async_hub_updated
+
+    for hub in handles:
+        unsubscribes.append(
+            async_dispatcher_connect(hass, f"{hub}-HubUpdateMessage", async_send_changes(hub))
+        )
+
+    @callback
+    def async_unsubscribe():
+        for unsubscribe in unsubscribes:
+            unsubscribe()
+
+    connection.subscriptions[msg["id"]] = async_unsubscribe
+    connection.send_result(msg["id"])
+    connection.send_message(
+        websocket_api.event_message(
+            msg["id"],
+            {
+                hub: {"changed": get_room_columns(rows), "removed": []}
+                for hub, rows in last_rows.items()
+            },
+        )
+    )
+
+
+@websocket_api.websocket_command(
+    {vol.Required("type"): "wiser/signal_history", vol.Optional(CONF_HUB_ID): str}
+)
+@callback
+def websocket_get_signal_history(hass, connection, msg):
+    """Return 24h signal statistics of each device of each hub."""
+    connection.send_result(
+        msg["id"],
+        {
+            hub: handle.signal_history.as_dict()
+            for hub, handle in _get_handles(hass, msg.get(CONF_HUB_ID)).items()
+        },
+    )
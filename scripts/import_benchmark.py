@@ -0,0 +1,53 @@
+"""
+Startup import time benchmark for the Wiser integration.
+
+Run from the repository root in an environment with Home Assistant and
+wiserHeatAPIv2 installed:
+
+    python scripts/import_benchmark.py [runs]
+
+Each module is imported in a fresh interpreter with -X importtime and the
+best cumulative time of all runs is reported, in milliseconds.
+"""
+import subprocess
+import sys
+
+PACKAGE = "custom_components.wiser"
+MODULES = [
+    PACKAGE,
+    f"{PACKAGE}.config_flow",
+    f"{PACKAGE}.climate",
+    f"{PACKAGE}.sensor",
+    f"{PACKAGE}.switch",
+    f"{PACKAGE}.select",
+    f"{PACKAGE}.button",
+    f"{PACKAGE}.diagnostics",
+]
+
+
+def import_time(module: str) -> float:
+    """Return cumulative import time of a module in a fresh interpreter, in ms."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Lines are "import time: self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1000
+    raise RuntimeError(f"No import time reported for {module}")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'module':<40} {'best ms':>10}")
+    for module in MODULES:
+        best = min(import_time(module) for _ in range(runs))
+        print(f"{module:<40} {best:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()